@@ -0,0 +1,168 @@
+import logging
+import os
+import time
+from collections import deque
+
+from discord.ext import tasks
+
+from sharding import cluster_id
+
+logger = logging.getLogger(__name__)
+
+# bot_state key changed on every edit, so cluster workers know to reload
+VERSION_KEY = 'auto_responses:version'
+
+
+class TriggerMatcher:
+    """Aho-Corasick automaton over auto-responder triggers.
+
+    Matching walks each message once, whatever the number of triggers.
+    Adding or removing a trigger only edits its own trie path; failure and
+    output links are recomputed lazily before the next match.
+    """
+
+    def __init__(self, triggers=()):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]  # trigger ending at this node
+        self._dict_link = [0]  # nearest proper suffix node with an output
+        self._dirty = False
+        for trigger in triggers:
+            self.add(trigger)
+
+    def add(self, trigger):
+        key = trigger.casefold()
+        if not key:
+            return
+        node = 0
+        for char in key:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._dict_link.append(0)
+            node = nxt
+        self._output[node] = trigger
+        self._dirty = True
+
+    def remove(self, trigger):
+        node = 0
+        for char in trigger.casefold():
+            node = self._goto[node].get(char)
+            if node is None:
+                return
+        if self._output[node] is not None:
+            self._output[node] = None
+            self._dirty = True
+
+    def _build_links(self):
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._dict_link[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                self._dict_link[child] = fail if self._output[fail] is not None else self._dict_link[fail]
+                queue.append(child)
+        self._dirty = False
+
+    def match(self, text):
+        """Return the trigger that starts earliest in text (longest on ties), or None"""
+        if self._dirty:
+            self._build_links()
+        best = None
+        best_start = None
+        node = 0
+        for index, char in enumerate(text.casefold()):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            out = node if self._output[node] is not None else self._dict_link[node]
+            while out:
+                trigger = self._output[out]
+                start = index - len(trigger) + 1
+                if best_start is None or start < best_start or (start == best_start and len(trigger) > len(best)):
+                    best, best_start = trigger, start
+                out = self._dict_link[out]
+        return best
+
+
+class AutoResponder:
+    """Auto responses kept in memory and matched with a TriggerMatcher.
+
+    In a cluster, every edit also bumps a version in bot_state; each worker
+    polls it and reloads when another worker has changed the responses.
+    """
+
+    def __init__(self, db, sync_interval=None):
+        self.db = db
+        self.responses = {}
+        self.matcher = TriggerMatcher()
+        self.version = None
+        sync_interval = sync_interval or float(os.getenv('AUTO_RESPONSE_SYNC_INTERVAL', '30'))  # seconds
+        self.sync_loop = tasks.loop(seconds=sync_interval)(self._sync)
+
+    def start(self):
+        if cluster_id() is not None and not self.sync_loop.is_running():
+            self.sync_loop.start()
+
+    def stop(self):
+        self.sync_loop.cancel()
+
+    async def load(self):
+        # Read the version first, so an edit made while loading triggers another reload
+        self.version = await self.db.get_state(VERSION_KEY)
+        # Copy, since the database returns its cached dict
+        self.responses = dict(await self.db.get_auto_responses())
+        self.matcher = TriggerMatcher(self.responses)
+        logger.info("Loaded %s auto response(s)", len(self.responses))
+
+    async def _sync(self):
+        try:
+            if await self.db.get_state(VERSION_KEY) == self.version:
+                return
+            # Another worker's edit only invalidated its own cache
+            self.db.cache.invalidate('auto_responses')
+            await self.load()
+        except Exception as e:
+            logger.error("Failed to sync auto responses: %s", e)
+
+    async def _bump_version(self):
+        self.version = str(time.time_ns())
+        await self.db.set_state(VERSION_KEY, self.version)
+
+    async def add(self, trigger, response):
+        await self.db.add_auto_response(trigger, response)
+        await self._bump_version()
+        if trigger not in self.responses:
+            self.matcher.add(trigger)
+        self.responses[trigger] = response
+
+    async def remove(self, trigger):
+        await self.db.remove_auto_response(trigger)
+        await self._bump_version()
+        if self.responses.pop(trigger, None) is not None:
+            self.matcher.remove(trigger)
+            # Another trigger may differ only by case and share the same trie node
+            key = trigger.casefold()
+            for other in self.responses:
+                if other.casefold() == key:
+                    self.matcher.add(other)
+                    break
+
+    def respond(self, content):
+        """Response for the first trigger found in content, or None"""
+        if not self.responses:
+            return None
+        trigger = self.matcher.match(content)
+        return self.responses.get(trigger) if trigger is not None else None
@@ -0,0 +1,91 @@
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    """Storage engine behind Database.
+
+    A backend only knows how to open DB-API connections; pooling, retries and
+    the schema are handled by Database, so every backend shares them.
+    """
+
+    name = None
+
+    def connect(self):
+        """Open and return a new DB-API connection"""
+        raise NotImplementedError
+
+
+class SQLiteCloudBackend(Backend):
+    """Remote SQLiteCloud database"""
+
+    name = 'sqlitecloud'
+
+    def __init__(self):
+        # Get credentials from environment variables
+        self.host = os.getenv('SQLITECLOUD_HOST', 'ccnvo0ujhk.g4.sqlite.cloud')
+        self.port = os.getenv('SQLITECLOUD_PORT', '8860')
+        self.database = os.getenv('SQLITECLOUD_DB', 'chinook.sqlite')
+        self.apikey = os.getenv('SQLITECLOUD_API_KEY', 'pk8J7e64Pt8yfjaYeR5S6L9Emj0CwZw8RYBno8fi7p4')
+
+    def connect(self):
+        # Imported lazily so the local backend runs without the sqlitecloud package
+        import sqlitecloud
+
+        logger.info("Attempting to connect to SQLiteCloud")
+
+        # Construct connection URL
+        connection_url = f"sqlitecloud://{self.host}:{self.port}/{self.database}?apikey={self.apikey}"
+
+        try:
+            # Open the connection to SQLite Cloud
+            conn = sqlitecloud.connect(connection_url)
+
+            # Test the connection once, before it enters the pool
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            result = cursor.fetchone()
+            if not result or result[0] != 1:
+                raise Exception("Connection test failed")
+        except Exception as e:
+            logger.error("Error connecting to SQLiteCloud database: %s", e)
+            raise
+
+        logger.info("Successfully connected to SQLiteCloud database")
+        return conn
+
+
+class SQLiteBackend(Backend):
+    """Local SQLite file in WAL mode, for small deployments, CI and benchmarks"""
+
+    name = 'sqlite'
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('SQLITE_PATH', 'bot.db')
+        self.busy_timeout = float(os.getenv('SQLITE_BUSY_TIMEOUT', '5'))  # seconds
+
+    def connect(self):
+        # Pooled connections move between executor threads, but only one thread uses each at a time
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        # WAL lets readers proceed while a writer commits
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+
+BACKENDS = {
+    SQLiteCloudBackend.name: SQLiteCloudBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def get_backend(name=None):
+    """Instantiate the backend named by ``name`` or the DB_BACKEND environment variable"""
+    name = (name or os.getenv('DB_BACKEND', SQLiteCloudBackend.name)).lower()
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown DB_BACKEND '{name}', expected one of: {', '.join(BACKENDS)}")
@@ -0,0 +1,135 @@
+import asyncio
+import bisect
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+MENTION_PATTERN = re.compile(r'^<@!?(\d+)>$')
+
+
+class GuildBans:
+    """Banned users of one guild, keyed by ID and by lowercase username"""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}  # lowercase name -> set of user IDs
+        self.names = []  # sorted lowercase names, for prefix autocomplete
+        self.ready = False
+
+    def add(self, user):
+        if user.id in self.by_id:
+            self.remove(user.id)
+        self.by_id[user.id] = user
+        name = user.name.lower()
+        ids = self.by_name.setdefault(name, set())
+        if not ids:
+            bisect.insort(self.names, name)
+        ids.add(user.id)
+
+    def remove(self, user_id):
+        user = self.by_id.pop(user_id, None)
+        if user is None:
+            return None
+        name = user.name.lower()
+        ids = self.by_name.get(name)
+        if ids is not None:
+            ids.discard(user_id)
+            if not ids:
+                del self.by_name[name]
+                index = bisect.bisect_left(self.names, name)
+                if index < len(self.names) and self.names[index] == name:
+                    del self.names[index]
+        return user
+
+    def find(self, query):
+        """Resolve an ID, mention, name or legacy name#discriminator to a banned user"""
+        query = query.strip()
+        match = MENTION_PATTERN.match(query)
+        if match:
+            query = match.group(1)
+        if query.isdigit():
+            return self.by_id.get(int(query))
+
+        name, _, discriminator = query.partition('#')
+        for user_id in self.by_name.get(name.lower(), ()):
+            user = self.by_id[user_id]
+            if not discriminator or user.discriminator == discriminator:
+                return user
+        return None
+
+    def complete(self, prefix, limit=25):
+        """Banned users whose username starts with prefix"""
+        prefix = prefix.strip().lower()
+        results = []
+        index = bisect.bisect_left(self.names, prefix)
+        while index < len(self.names) and len(results) < limit:
+            name = self.names[index]
+            if not name.startswith(prefix):
+                break
+            results.extend(self.by_id[user_id] for user_id in self.by_name[name])
+            index += 1
+        return results[:limit]
+
+
+class BanIndex:
+    """Ban lists of every guild, fetched once and kept current by ban events"""
+
+    def __init__(self):
+        self.guilds = {}
+        self._builds = {}
+
+    def _bans(self, guild_id):
+        bans = self.guilds.get(guild_id)
+        if bans is None:
+            bans = self.guilds[guild_id] = GuildBans()
+        return bans
+
+    async def ensure(self, guild):
+        """Return the guild's bans, fetching the full list on first use"""
+        bans = self._bans(guild.id)
+        if bans.ready:
+            return bans
+        task = self._builds.get(guild.id)
+        if task is None:
+            task = self._builds[guild.id] = asyncio.create_task(self._build(guild, bans))
+        await asyncio.shield(task)
+        if not bans.ready:
+            raise RuntimeError("Could not fetch the ban list")
+        return bans
+
+    def warm(self, guild):
+        """Start fetching the guild's ban list in the background"""
+        if not self._bans(guild.id).ready and guild.id not in self._builds:
+            self._builds[guild.id] = asyncio.create_task(self._build(guild, self._bans(guild.id)))
+
+    async def _build(self, guild, bans):
+        try:
+            count = 0
+            async for entry in guild.bans(limit=None):
+                bans.add(entry.user)
+                count += 1
+            bans.ready = True
+            logger.info("Indexed %s ban(s) for guild %s", count, guild.id)
+        except Exception as e:
+            logger.error("Error fetching bans for guild %s: %s", guild.id, e)
+        finally:
+            self._builds.pop(guild.id, None)
+
+    def add(self, guild_id, user):
+        self._bans(guild_id).add(user)
+
+    def remove(self, guild_id, user_id):
+        return self._bans(guild_id).remove(user_id)
+
+    async def find(self, guild, query):
+        bans = await self.ensure(guild)
+        return bans.find(query)
+
+    def complete(self, guild, prefix, limit=25):
+        """Autocomplete matches; empty until the guild's ban list has been fetched"""
+        bans = self._bans(guild.id)
+        if not bans.ready:
+            self.warm(guild)
+            return []
+        return bans.complete(prefix, limit)
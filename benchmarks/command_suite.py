@@ -0,0 +1,80 @@
+"""Command handler benchmarks: the callbacks from bot.py driven with fake interactions and contexts"""
+from benchmarks.fakes import (
+    FakeChannel, FakeContext, FakeGuild, FakeInteraction, FakeMember, FakeMessage, FakePermissions, FakeRole
+)
+from benchmarks.harness import measure
+
+
+async def run(bot_module, iterations, concurrency):
+    db = bot_module.db
+    guild = FakeGuild()
+    moderator = FakeMember(
+        'moderator', guild,
+        roles=[guild.roles[-2]],
+        permissions=FakePermissions(manage_guild=True)
+    )
+    guild.add_member(moderator)
+    targets = guild.members[:100]
+    channel = FakeChannel(guild)
+
+    # A few existing mod roles so listmodroles renders a real embed
+    for role in guild.roles[1:6]:
+        await db.add_mod_role(role.id)
+    await bot_module.auto_responder.load()
+    await bot_module.auto_responder.add('hello bot', 'Hello!')
+
+    added_roles = []
+
+    def interaction():
+        return FakeInteraction(guild, moderator, channel)
+
+    def context():
+        return FakeContext(guild, moderator, channel)
+
+    async def kick_slash(i):
+        await bot_module.kick_slash.callback(interaction(), targets[i % len(targets)], 'benchmark')
+
+    async def ban_slash(i):
+        await bot_module.ban_slash.callback(interaction(), targets[i % len(targets)], 'benchmark')
+
+    async def addmodrole(i):
+        role = guild.add_role(FakeRole(f'bench-{i}', 1, guild))
+        added_roles.append(role)
+        await bot_module.addmodrole.callback(interaction(), str(role.id))
+
+    async def listmodroles(i):
+        await bot_module.listmodroles.callback(interaction())
+
+    async def removemodrole(i):
+        # Removes the roles addmodrole created, then exercises the not-a-mod-role path
+        role_id = added_roles.pop().id if added_roles else guild.roles[-1].id
+        await bot_module.removemodrole.callback(interaction(), str(role_id))
+
+    async def dbstatus(i):
+        await bot_module.dbstatus.callback(interaction())
+
+    async def kick_prefix(i):
+        await bot_module.kick_prefix.callback(context(), targets[i % len(targets)], reason='benchmark')
+
+    async def radd(i):
+        await bot_module.radd.callback(context(), targets[i % len(targets)], 100)
+
+    async def auto_respond(i):
+        text = 'hello bot' if i % 10 == 0 else f'just chatting about item {i}'
+        await bot_module.auto_respond(FakeMessage(channel, text, targets[i % len(targets)]))
+
+    cases = {
+        'command.kick': kick_slash,
+        'command.ban': ban_slash,
+        'command.listmodroles': listmodroles,
+        'command.addmodrole': addmodrole,
+        'command.removemodrole': removemodrole,
+        'command.dbstatus': dbstatus,
+        'prefix.kick': kick_prefix,
+        'prefix.radd': radd,
+        'event.auto_respond': auto_respond,
+    }
+    results = {}
+    for name, operation in cases.items():
+        results[name] = await measure(operation, iterations, concurrency=concurrency)
+    return results
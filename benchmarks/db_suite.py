@@ -0,0 +1,73 @@
+"""Database method benchmarks, run through AsyncDatabase like the command handlers do"""
+import itertools
+
+from benchmarks.harness import measure
+
+SEED_USERS = 1000
+
+
+async def seed(db):
+    for user_id in range(1, SEED_USERS + 1):
+        await db.add_balance(user_id, 1_000_000)
+    for role_id in range(1, 11):
+        await db.add_mod_role(role_id)
+    for role_id in range(1, 21):
+        await db.add_job(role_id, 100)
+    await db.flush_balances()
+
+
+async def run(db, iterations, concurrency):
+    await seed(db)
+    fresh_users = itertools.count(10_000_000)
+    ticket_id = await db.create_ticket(1, 1)
+    results = {}
+
+    async def get_balance_cached(i):
+        await db.get_balance(i % SEED_USERS + 1)
+
+    async def get_balance_uncached(i):
+        await db.get_balance(next(fresh_users))
+
+    async def set_balance(i):
+        # Stay well funded for the transfer benchmark
+        await db.set_balance(i % SEED_USERS + 1, 1_000_000 + i)
+
+    async def add_balance(i):
+        await db.add_balance(i % SEED_USERS + 1, 1)
+
+    async def transfer(i):
+        sender = i % SEED_USERS + 1
+        await db.transfer(sender, sender % SEED_USERS + 1, 1)
+
+    async def get_mod_roles_cached(i):
+        await db.get_mod_roles()
+
+    async def get_mod_roles_uncached(i):
+        db.db.cache.invalidate('mod_roles')
+        await db.get_mod_roles()
+
+    async def get_jobs(i):
+        await db.get_jobs()
+
+    async def log_ticket_action(i):
+        await db.log_ticket_action(ticket_id, 'bench', f'iteration {i}')
+
+    async def get_open_tickets(i):
+        await db.get_open_tickets()
+
+    cases = {
+        'db.get_balance[cached]': get_balance_cached,
+        'db.get_balance[uncached]': get_balance_uncached,
+        'db.set_balance': set_balance,
+        'db.add_balance': add_balance,
+        'db.transfer': transfer,
+        'db.get_mod_roles[cached]': get_mod_roles_cached,
+        'db.get_mod_roles[uncached]': get_mod_roles_uncached,
+        'db.get_jobs': get_jobs,
+        'db.log_ticket_action': log_ticket_action,
+        'db.get_open_tickets': get_open_tickets,
+    }
+    for name, operation in cases.items():
+        results[name] = await measure(operation, iterations, concurrency=concurrency)
+    await db.flush_balances()
+    return results
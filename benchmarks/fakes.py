@@ -0,0 +1,275 @@
+"""Stand-ins for the discord.py objects command handlers touch, plus a local database backend"""
+import functools
+import itertools
+import os
+import time
+
+from backends import SQLiteBackend
+
+_ids = itertools.count(100000000000000000)
+
+
+def snowflake():
+    return next(_ids)
+
+
+class FakePermissions:
+    def __init__(self, **flags):
+        self.manage_guild = flags.get('manage_guild', False)
+        self.administrator = flags.get('administrator', False)
+        self.manage_messages = flags.get('manage_messages', False)
+
+
+@functools.total_ordering
+class FakeRole:
+    def __init__(self, name, position, guild=None, role_id=None):
+        self.id = role_id or snowflake()
+        self.name = name
+        self.position = position
+        self.guild = guild
+        self.members = []
+        self.mention = f'<@&{self.id}>'
+
+    def __eq__(self, other):
+        return isinstance(other, FakeRole) and self.id == other.id
+
+    def __lt__(self, other):
+        return self.position < other.position
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeUser:
+    bot = False
+    discriminator = '0'
+
+    def __init__(self, name, user_id=None):
+        self.id = user_id or snowflake()
+        self.name = name
+        self.display_name = name
+        self.mention = f'<@{self.id}>'
+        self.sent = []
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+
+class FakeMember(FakeUser):
+    def __init__(self, name, guild, roles=(), permissions=None, user_id=None):
+        super().__init__(name, user_id)
+        self.guild = guild
+        self.roles = [guild.default_role, *roles]
+        self.guild_permissions = permissions or FakePermissions()
+        self.joined_at = None
+        self.kicked = 0
+        self.banned = 0
+
+    @property
+    def top_role(self):
+        return max(self.roles)
+
+    async def kick(self, reason=None):
+        self.kicked += 1
+
+    async def ban(self, reason=None, **kwargs):
+        self.banned += 1
+
+    async def timeout(self, duration, reason=None):
+        pass
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(role for role in roles if role not in self.roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        self.roles = [role for role in self.roles if role not in roles]
+
+
+class FakeGuild:
+    def __init__(self, name='Benchmark Guild', role_count=20, member_count=200):
+        self.id = snowflake()
+        self.name = name
+        self.icon = None
+        self.chunked = True
+        self.shard_id = 0
+        self.default_role = FakeRole('@everyone', 0, self, role_id=self.id)
+        self._roles = {self.default_role.id: self.default_role}
+        for position in range(1, role_count + 1):
+            self.add_role(FakeRole(f'role-{position}', position, self))
+        self._members = {}
+        for index in range(member_count):
+            self.add_member(FakeMember(f'member-{index}', self))
+        self.owner_id = snowflake()
+        self.me = self.add_member(FakeMember('bot', self, roles=[self.top_role()]))
+
+    def add_role(self, role):
+        self._roles[role.id] = role
+        return role
+
+    def add_member(self, member):
+        self._members[member.id] = member
+        for role in member.roles:
+            role.members.append(member)
+        return member
+
+    def top_role(self):
+        return max(self._roles.values())
+
+    @property
+    def roles(self):
+        return sorted(self._roles.values())
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+    async def ban(self, user, reason=None, **kwargs):
+        pass
+
+    async def unban(self, user, reason=None):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, guild):
+        self.id = snowflake()
+        self.guild = guild
+        self.mention = f'<#{self.id}>'
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+        return FakeMessage(self, content)
+
+
+class FakeMessage:
+    def __init__(self, channel, content, author=None):
+        self.id = snowflake()
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content or ''
+        self.author = author
+
+    async def edit(self, **kwargs):
+        pass
+
+    async def delete(self):
+        pass
+
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.messages.append((content, kwargs))
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+
+
+class FakeFollowup:
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def send(self, content=None, **kwargs):
+        return FakeMessage(self.channel, content)
+
+
+class FakeInteraction:
+    """Enough of discord.Interaction for the slash command callbacks"""
+
+    def __init__(self, guild, user, channel=None, command=None):
+        self.id = snowflake()
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = channel or FakeChannel(guild)
+        self.channel_id = self.channel.id
+        self.command = command
+        self.extras = {}
+        self.response = FakeResponse()
+        self.followup = FakeFollowup(self.channel)
+
+    async def original_response(self):
+        return FakeMessage(self.channel, None, self.user)
+
+
+class FakeContext:
+    """Enough of commands.Context for the prefix command callbacks"""
+
+    def __init__(self, guild, author, channel=None, command=None):
+        self.guild = guild
+        self.author = author
+        self.channel = channel or FakeChannel(guild)
+        self.message = FakeMessage(self.channel, '', author)
+        self.command = command
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+        return FakeMessage(self.channel, content, self.author)
+
+
+class _SlowCursor:
+    def __init__(self, cursor, latency):
+        self._cursor = cursor
+        self._latency = latency
+
+    def execute(self, *args):
+        time.sleep(self._latency)
+        return self._cursor.execute(*args)
+
+    def executemany(self, *args):
+        time.sleep(self._latency)
+        return self._cursor.executemany(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _SlowConnection:
+    def __init__(self, conn, latency):
+        self._conn = conn
+        self._latency = latency
+
+    def cursor(self):
+        return _SlowCursor(self._conn.cursor(), self._latency)
+
+    def commit(self):
+        time.sleep(self._latency)
+        return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class BenchBackend(SQLiteBackend):
+    """SQLite with an optional per-statement delay (BENCH_DB_LATENCY_MS) standing in for a remote database"""
+
+    name = 'bench'
+
+    def __init__(self, path=None):
+        super().__init__(path)
+        self.latency = float(os.getenv('BENCH_DB_LATENCY_MS', '0')) / 1000
+
+    def connect(self):
+        conn = super().connect()
+        return _SlowConnection(conn, self.latency) if self.latency else conn
@@ -0,0 +1,109 @@
+"""Timing, percentiles and JSON result files for the benchmark suites"""
+import asyncio
+import json
+import math
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles in milliseconds and throughput in operations per second"""
+    ordered = sorted(samples)
+    return {
+        'iterations': len(samples),
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'mean_ms': sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        'max_ms': ordered[-1] * 1000 if ordered else 0.0,
+        'ops_per_sec': len(samples) / elapsed if elapsed else 0.0,
+    }
+
+
+async def measure(operation, iterations, warmup=10, concurrency=1):
+    """Await operation(i) iterations times across `concurrency` workers and summarize the timings.
+
+    operation receives the iteration number so each call can use fresh inputs.
+    """
+    for i in range(warmup):
+        await operation(i)
+
+    samples = []
+    counter = iter(range(iterations))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            await operation(i)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - started)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**settings):
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': settings,
+    }
+
+
+def save(path, meta, results):
+    with open(path, 'w') as file:
+        json.dump({'meta': meta, 'results': results}, file, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(baseline, results, threshold=0.10):
+    """Rows of (name, metric, old, new, change) and whether any p50/p95 got slower than threshold"""
+    rows = []
+    regressed = False
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            old, new = previous[metric], current[metric]
+            change = (new - old) / old if old else 0.0
+            rows.append((name, metric, old, new, change))
+            if metric != 'p99_ms' and change > threshold:
+                regressed = True
+    return rows, regressed
+
+
+def format_table(results):
+    lines = [f"{'benchmark':<36} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}"]
+    for name, stats in sorted(results.items()):
+        lines.append(
+            f"{name:<36} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+            f"{stats['p99_ms']:>9.3f} {stats['ops_per_sec']:>10.0f}"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,257 @@
+"""Synthetic gateway load: floods the bot's event handlers and slash commands without connecting to Discord.
+
+    python -m benchmarks.loadgen [--duration S] [--messages-per-sec N] [--joins-per-sec N]
+                                 [--bans-per-sec N] [--interactions-per-sec N] [--db-latency-ms MS]
+
+Each simulated event is handed to every registered listener in its own task,
+the way discord.py dispatches gateway events; interactions run slash command
+callbacks with fake interactions. While the load runs it records event-loop
+lag, the number of handlers in flight, the database executor backlog and
+per-event handler latency.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.run import RESULTS_DIR, configure_environment
+
+# How often the monitor wakes up; lag is how late it wakes
+MONITOR_INTERVAL = 0.01  # seconds
+# Producers emit whatever their rate accumulated since the previous tick
+PRODUCER_TICK = 0.005  # seconds
+
+CHAT_LINES = (
+    'anyone online?', 'gg', 'hello bot', 'what time is the event', 'lol', 'check the rules channel',
+    'who is hosting tonight', 'brb', 'thanks!', 'can a mod help me',
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load')
+    parser.add_argument('--messages-per-sec', type=float, default=500.0)
+    parser.add_argument('--joins-per-sec', type=float, default=20.0)
+    parser.add_argument('--bans-per-sec', type=float, default=5.0)
+    parser.add_argument('--interactions-per-sec', type=float, default=20.0)
+    parser.add_argument('--db-latency-ms', type=float, default=0.0, help='delay added to every SQL statement')
+    parser.add_argument('--log-level', help='LOG_LEVEL for the run, e.g. DEBUG to include logging cost')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/loadgen-<commit>.json)')
+    return parser.parse_args()
+
+
+class LoadStats:
+    def __init__(self):
+        self.lag = []
+        self.in_flight = []
+        self.db_backlog = []
+        self.handler_latency = {}
+        self.emitted = {}
+        self.errors = {}
+
+    def record_handler(self, event, seconds):
+        self.handler_latency.setdefault(event, []).append(seconds)
+
+
+class Dispatcher:
+    """Runs every listener for an event in its own task and times it"""
+
+    def __init__(self, bot, stats):
+        self.bot = bot
+        self.stats = stats
+        self.tasks = set()
+
+    def listeners(self, event):
+        handlers = list(self.bot.extra_events.get(f'on_{event}', ()))
+        # Bot.on_message parses prefix commands from real gateway messages; fake
+        # messages only go to the listeners registered in bot.py
+        if event != 'message':
+            handler = getattr(self.bot, f'on_{event}', None)
+            if handler is not None:
+                handlers.append(handler)
+        return handlers
+
+    def dispatch(self, event, *args):
+        self.stats.emitted[event] = self.stats.emitted.get(event, 0) + 1
+        for handler in self.listeners(event):
+            self.spawn(event, handler(*args))
+
+    def spawn(self, label, coro):
+        task = asyncio.get_running_loop().create_task(self._timed(label, coro))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _timed(self, label, coro):
+        started = time.perf_counter()
+        try:
+            await coro
+        except Exception as e:
+            key = f'{label}: {type(e).__name__}'
+            self.stats.errors[key] = self.stats.errors.get(key, 0) + 1
+        finally:
+            self.stats.record_handler(label, time.perf_counter() - started)
+
+
+async def monitor(stats, dispatcher, executor, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + MONITOR_INTERVAL
+        await asyncio.sleep(MONITOR_INTERVAL)
+        stats.lag.append(max(0.0, loop.time() - expected))
+        stats.in_flight.append(len(dispatcher.tasks))
+        # Work queued for the database threads but not yet started
+        stats.db_backlog.append(executor._work_queue.qsize())
+
+
+async def produce(rate, emit, stop):
+    """Call emit() `rate` times per second until stop is set"""
+    if rate <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    owed = 0.0
+    last = loop.time()
+    while not stop.is_set():
+        await asyncio.sleep(PRODUCER_TICK)
+        now = loop.time()
+        owed += (now - last) * rate
+        last = now
+        while owed >= 1:
+            emit()
+            owed -= 1
+
+
+async def run_load(args):
+    import bot
+    from benchmarks.fakes import (
+        FakeChannel, FakeGuild, FakeInteraction, FakeMember, FakeMessage, FakePermissions, FakeUser
+    )
+
+    stats = LoadStats()
+    dispatcher = Dispatcher(bot.bot, stats)
+    await bot.db.setup()
+    await bot.auto_responder.load()
+    await bot.auto_responder.add('hello bot', 'Hello!')
+
+    guild = FakeGuild(member_count=1000)
+    channel = FakeChannel(guild)
+    moderator = guild.add_member(FakeMember(
+        'moderator', guild, roles=[guild.roles[-2]], permissions=FakePermissions(manage_guild=True)
+    ))
+    for role in guild.roles[1:6]:
+        await bot.db.add_mod_role(role.id)
+    members = guild.members[:-2]
+
+    def message():
+        author = random.choice(members)
+        dispatcher.dispatch('message', FakeMessage(channel, random.choice(CHAT_LINES), author))
+
+    def member_join():
+        dispatcher.dispatch('member_join', guild.add_member(FakeMember(f'joiner-{len(guild.members)}', guild)))
+
+    def ban():
+        dispatcher.dispatch('member_ban', guild, FakeUser(f'banned-{random.randrange(10 ** 9)}'))
+
+    commands = (
+        ('kick', lambda interaction: bot.kick_slash.callback(interaction, random.choice(members), 'load test')),
+        ('listmodroles', lambda interaction: bot.listmodroles.callback(interaction)),
+        ('dbstatus', lambda interaction: bot.dbstatus.callback(interaction)),
+        ('addmodrole', lambda interaction: bot.addmodrole.callback(interaction, str(random.choice(guild.roles).id))),
+    )
+
+    def interaction():
+        name, callback = random.choice(commands)
+        stats.emitted['interaction'] = stats.emitted.get('interaction', 0) + 1
+        dispatcher.spawn(f'command.{name}', callback(FakeInteraction(guild, moderator, channel)))
+
+    stop = asyncio.Event()
+    workers = [
+        asyncio.create_task(monitor(stats, dispatcher, bot.db.executor, stop)),
+        asyncio.create_task(produce(args.messages_per_sec, message, stop)),
+        asyncio.create_task(produce(args.joins_per_sec, member_join, stop)),
+        asyncio.create_task(produce(args.bans_per_sec, ban, stop)),
+        asyncio.create_task(produce(args.interactions_per_sec, interaction, stop)),
+    ]
+    started = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*workers)
+    # Let in-flight handlers finish so their latency is counted
+    drain_started = time.perf_counter()
+    while dispatcher.tasks:
+        await asyncio.sleep(MONITOR_INTERVAL)
+    drain = time.perf_counter() - drain_started
+    elapsed = time.perf_counter() - started
+    await bot.db.close()
+    return stats, elapsed, drain
+
+
+def report(stats, elapsed, drain, args):
+    from benchmarks.harness import percentile, summarize
+
+    def distribution(values, scale=1.0):
+        ordered = sorted(values)
+        return {
+            'p50': percentile(ordered, 0.50) * scale,
+            'p95': percentile(ordered, 0.95) * scale,
+            'p99': percentile(ordered, 0.99) * scale,
+            'max': (ordered[-1] if ordered else 0) * scale,
+        }
+
+    return {
+        'elapsed_s': elapsed,
+        'drain_s': drain,
+        'events_emitted': stats.emitted,
+        'events_per_sec': {event: count / args.duration for event, count in stats.emitted.items()},
+        'loop_lag_ms': distribution(stats.lag, 1000),
+        'handlers_in_flight': distribution(stats.in_flight),
+        'db_backlog': distribution(stats.db_backlog),
+        'handler_latency': {
+            event: summarize(samples, elapsed) for event, samples in sorted(stats.handler_latency.items())
+        },
+        'errors': stats.errors,
+    }
+
+
+def print_report(result):
+    lag = result['loop_lag_ms']
+    print(f"Ran for {result['elapsed_s']:.1f}s ({result['drain_s']:.2f}s draining the backlog)")
+    print('Emitted: ' + ', '.join(f'{count} {event}' for event, count in sorted(result['events_emitted'].items())))
+    print(f"Loop lag ms:        p50 {lag['p50']:.2f}  p95 {lag['p95']:.2f}  p99 {lag['p99']:.2f}  max {lag['max']:.2f}")
+    for name in ('handlers_in_flight', 'db_backlog'):
+        depth = result[name]
+        print(f"{name + ':':<20}p50 {depth['p50']:.0f}  p95 {depth['p95']:.0f}  max {depth['max']:.0f}")
+    print(f"\n{'handler':<28} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for event, latency in result['handler_latency'].items():
+        print(f"{event:<28} {latency['iterations']:>7} {latency['p50_ms']:>9.3f} "
+              f"{latency['p95_ms']:>9.3f} {latency['p99_ms']:>9.3f}")
+    if result['errors']:
+        print('\nErrors: ' + ', '.join(f'{key} x{count}' for key, count in result['errors'].items()))
+
+
+def main():
+    args = parse_args()
+    if args.log_level:
+        os.environ['LOG_LEVEL'] = args.log_level
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir, args)
+        from benchmarks import harness
+        from logs import setup_logging
+
+        setup_logging()
+        stats, elapsed, drain = asyncio.run(run_load(args))
+
+    result = report(stats, elapsed, drain, args)
+    print_report(result)
+    meta = harness.metadata(**{key: value for key, value in vars(args).items() if key != 'output'})
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"loadgen-{meta['commit'] or 'unknown'}.json")
+    harness.save(output, meta, result)
+    print(f"\nSaved results to {output}")
+
+
+if __name__ == '__main__':
+    main()
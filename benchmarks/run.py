@@ -0,0 +1,103 @@
+"""Offline benchmarks for the command handlers and the database layer.
+
+    python -m benchmarks.run [--iterations N] [--concurrency N] [--db-latency-ms MS]
+                             [--suite db|commands] [--output results.json] [--baseline old.json]
+
+No Discord connection is made: handlers get fake interactions and contexts,
+and the database is a throwaway SQLite file, optionally slowed down per
+statement to stand in for a remote database. Results are printed and saved as
+JSON; with --baseline the run is compared against an earlier result file and
+exits with status 1 when a p50 or p95 regressed by more than --threshold.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=1, help='operations in flight at once')
+    parser.add_argument('--db-latency-ms', type=float, default=0.0, help='delay added to every SQL statement')
+    parser.add_argument('--suite', choices=('db', 'commands'), action='append', help='default: all suites')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--baseline', help='earlier result file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed p50/p95 slowdown, as a fraction')
+    return parser.parse_args()
+
+
+def configure_environment(workdir, args):
+    # Must happen before bot.py and database.py are imported
+    os.environ['DB_BACKEND'] = 'bench'
+    os.environ['SQLITE_PATH'] = os.path.join(workdir, 'bench.db')
+    os.environ['BENCH_DB_LATENCY_MS'] = str(args.db_latency_ms)
+    os.environ['METRICS_PORT'] = '0'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+    import backends
+    from benchmarks.fakes import BenchBackend
+    backends.BACKENDS[BenchBackend.name] = BenchBackend
+
+
+async def run_suites(args):
+    import bot
+    from benchmarks import command_suite, db_suite
+
+    suites = args.suite or ['db', 'commands']
+    results = {}
+    await bot.db.setup()
+    try:
+        if 'db' in suites:
+            results.update(await db_suite.run(bot.db, args.iterations, args.concurrency))
+        if 'commands' in suites:
+            results.update(await command_suite.run(bot, args.iterations, args.concurrency))
+    finally:
+        await bot.db.close()
+    return results
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir, args)
+        from benchmarks import harness
+        from logs import setup_logging
+
+        setup_logging()
+        results = asyncio.run(run_suites(args))
+
+    print(harness.format_table(results))
+    meta = harness.metadata(
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+        db_latency_ms=args.db_latency_ms,
+    )
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{meta['commit'] or 'unknown'}.json")
+    harness.save(output, meta, results)
+    print(f"\nSaved results to {output}")
+
+    if args.baseline:
+        baseline = harness.load(args.baseline)
+        rows, regressed = harness.compare(baseline['results'], results, args.threshold)
+        print(f"\nCompared with {baseline['meta'].get('commit')}:")
+        if baseline['meta'].get('settings') != meta['settings']:
+            print(f"Warning: baseline settings differ: {baseline['meta'].get('settings')}")
+        for name, metric, old, new, change in rows:
+            flag = '  <-- slower' if metric != 'p99_ms' and change > args.threshold else ''
+            print(f"{name:<36} {metric:<7} {old:>9.3f} -> {new:>9.3f} ms ({change:+.1%}){flag}")
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
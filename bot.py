@@ -2,22 +2,70 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import os
+import io
+import logging
+import re
+import math
+import asyncio
+import signal
 from dotenv import load_dotenv
-from database import Database
+from database import AsyncDatabase
+from payroll import Payroll
+from fines import FineEnforcer
+from autoresponder import AutoResponder
+from tickets import TicketManager
+from ban_index import BanIndex
+from bulk_mod import BulkDispatcher, check_hierarchy, parse_ids, resolve_targets, timeout_duration
+from purge import PurgeCancelView, PurgeFilter, PurgeJob
+from command_sync import sync_commands, sync_guild_id
+from sharding import ShardReporter, cluster_id, create_bot, shard_report
+from gateway import GatewayStats, build_intents, build_member_cache_flags, chunk_guilds_at_startup, ensure_chunked
+from datetime import datetime, timedelta, timezone
+from logs import setup_logging
+from metrics import InstrumentedCommandTree, MetricsServer, instrument
+from watchdog import LoopWatchdog
+from scheduler import Scheduler, end_of_week, parse_duration
+
+logger = logging.getLogger('bot')
 
 # Load environment variables
 load_dotenv()
 
 # Bot configuration
-intents = discord.Intents.all()  # Enable all intents
-intents.message_content = True  # Enable message content intent
+# Only the intents the commands need by default; see DISCORD_INTENTS in gateway.py
+intents = build_intents()
+gateway_stats = GatewayStats(os.getenv('DISCORD_INTENTS', 'minimal'))
 
 # Custom prefix
-bot = commands.Bot(command_prefix='-', intents=intents)
+# AutoShardedBot when BOT_SHARDING=auto or when started by cluster.py
+bot = create_bot(
+    command_prefix='-',
+    intents=intents,
+    member_cache_flags=build_member_cache_flags(intents),
+    chunk_guilds_at_startup=chunk_guilds_at_startup(),
+    # Needed for on_socket_event_type, which feeds the event-rate report
+    enable_debug_events=True,
+    # Times every slash command for /metrics
+    tree_cls=InstrumentedCommandTree
+)
 tree = bot.tree
 
 # Initialize database
-db = Database()
+db = AsyncDatabase()
+payroll = Payroll(bot, db)
+fine_enforcer = FineEnforcer(bot, db)
+shard_reporter = ShardReporter(bot, db)
+auto_responder = AutoResponder(db)
+tickets = TicketManager(bot, db)
+ban_index = BanIndex()
+bulk_dispatcher = BulkDispatcher()
+metrics_server = MetricsServer()
+watchdog = LoopWatchdog()
+scheduler = Scheduler(bot, db)
+instrument(bot, db)
+
+# Discord refuses timeouts of 28 days or more; longer mutes are re-applied by the scheduler
+MAX_TIMEOUT = timedelta(days=28) - timedelta(minutes=1)
 
 # Role ID for رصد command permission (replace with your role ID)
 RADD_ROLE_ID = 1367905739183624344  # Replace this with your role ID
@@ -38,6 +86,9 @@ def has_radd_role():
 @bot.command(name="رصد")
 @has_radd_role()
 async def radd(ctx, member: discord.Member, amount: int):
+    if amount <= 0:
+        await ctx.send("يجب أن يكون مبلغ المخالفة أكبر من صفر")
+        return
     try:
         # Create embed for DM
         embed = discord.Embed(
@@ -68,6 +119,11 @@ async def radd(ctx, member: discord.Member, amount: int):
         # Add footer with police greeting
         embed.set_footer(text="<:NW:1368887896551198750> تحياة شرطة 👮 سيرفر", icon_url=ctx.guild.icon.url if ctx.guild.icon else None)
         
+        # The fine and its deadline are recorded even if the member has DMs closed
+        deadline = end_of_week()
+        fine_id = await db.add_fine(ctx.guild.id, member.id, amount, ctx.author.id, deadline.timestamp())
+        await scheduler.schedule('fine_deadline', ctx.guild.id, member.id, deadline, {'fine_id': fine_id})
+
         # Send DM to the mentioned user
         await member.send(embed=embed)
         await ctx.send(f"تم إرسال التنبيه إلى {member.mention}")
@@ -115,35 +171,326 @@ async def ban_slash(interaction: discord.Interaction, member: discord.Member, re
         await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
 
 @tree.command(name="unban", description="Unban a member from the server")
+@app_commands.describe(member="User ID, mention or username of the banned user")
 @has_manage_server()
 async def unban_slash(interaction: discord.Interaction, member: str):
     try:
-        banned_users = [entry async for entry in interaction.guild.bans()]
-        member_name, member_discriminator = member.split('#')
-
-        for ban_entry in banned_users:
-            user = ban_entry.user
-            if (user.name, user.discriminator) == (member_name, member_discriminator):
-                await interaction.guild.unban(user)
-                await interaction.response.send_message(f'Unbanned {user.mention}')
-                return
+        # Building the ban index can outlast the response deadline
+        await interaction.response.defer(ephemeral=True)
+        user = await ban_index.find(interaction.guild, member)
+        if user is None:
+            await interaction.followup.send(f"Could not find banned user {member}", ephemeral=True)
+            return
         
-        await interaction.response.send_message(f"Could not find banned user {member}", ephemeral=True)
+        await interaction.guild.unban(user)
+        ban_index.remove(interaction.guild.id, user.id)
+        await interaction.followup.send(f'Unbanned {user.mention}')
+    except Exception as e:
+        await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+
+@unban_slash.autocomplete('member')
+async def unban_autocomplete(interaction: discord.Interaction, current: str):
+    return [
+        app_commands.Choice(name=f"{user.name} ({user.id})", value=str(user.id))
+        for user in ban_index.complete(interaction.guild, current)
+    ]
+
+# Upper bound on messages deleted by one /clear or /purge
+PURGE_MAX = int(os.getenv('PURGE_MAX', '5000'))
+
+@tree.command(name="tempban", description="Ban a member for a limited time")
+@app_commands.describe(duration="How long, e.g. 12h, 7d or 1w2d")
+@has_manage_server()
+async def tempban_slash(interaction: discord.Interaction, member: discord.Member, duration: str, reason: str = None):
+    try:
+        length = parse_duration(duration)
+        reason = reason or "No reason provided"
+        protected = check_hierarchy(interaction.user, member)
+        if protected:
+            await interaction.response.send_message(f"You cannot ban this member ({protected})!", ephemeral=True)
+            return
+
+        expires_at = discord.utils.utcnow() + length
+        await member.ban(reason=f"{reason} (temporary, by {interaction.user})")
+        await scheduler.cancel('unban', interaction.guild.id, member.id)
+        await scheduler.schedule('unban', interaction.guild.id, member.id, expires_at)
+        await interaction.response.send_message(
+            f"Banned {member.mention} until {discord.utils.format_dt(expires_at)} for: {reason}"
+        )
+    except ValueError as e:
+        await interaction.response.send_message(str(e), ephemeral=True)
+    except discord.Forbidden:
+        await interaction.response.send_message("I don't have permission to ban members!", ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+
+@tree.command(name="mute", description="Time out a member; mutes longer than 28 days are renewed automatically")
+@app_commands.describe(duration="How long, e.g. 30m, 12h or 60d")
+@has_manage_server()
+async def mute_slash(interaction: discord.Interaction, member: discord.Member, duration: str, reason: str = None):
+    try:
+        length = parse_duration(duration)
+        reason = reason or "No reason provided"
+        protected = check_hierarchy(interaction.user, member)
+        if protected:
+            await interaction.response.send_message(f"You cannot mute this member ({protected})!", ephemeral=True)
+            return
+
+        until = discord.utils.utcnow() + length
+        await member.timeout(min(length, MAX_TIMEOUT), reason=f"{reason} (by {interaction.user})")
+        await scheduler.cancel('timeout', interaction.guild.id, member.id)
+        if length > MAX_TIMEOUT:
+            await scheduler.schedule(
+                'timeout', interaction.guild.id, member.id,
+                discord.utils.utcnow() + MAX_TIMEOUT - timedelta(minutes=5),
+                {'until': until.timestamp(), 'reason': reason}
+            )
+        await interaction.response.send_message(
+            f"Muted {member.mention} until {discord.utils.format_dt(until)} for: {reason}"
+        )
+    except ValueError as e:
+        await interaction.response.send_message(str(e), ephemeral=True)
+    except discord.Forbidden:
+        await interaction.response.send_message("I don't have permission to time out members!", ephemeral=True)
     except Exception as e:
         await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
 
+@tree.command(name="unmute", description="Remove a member's timeout")
+@has_manage_server()
+async def unmute_slash(interaction: discord.Interaction, member: discord.Member):
+    try:
+        await member.timeout(None, reason=f"Unmuted by {interaction.user}")
+        await scheduler.cancel('timeout', interaction.guild.id, member.id)
+        await interaction.response.send_message(f"Unmuted {member.mention}")
+    except discord.Forbidden:
+        await interaction.response.send_message("I don't have permission to time out members!", ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+
+@scheduler.handler('unban')
+async def expire_tempban(action):
+    guild = bot.get_guild(action.guild_id)
+    if guild is None:
+        return
+    try:
+        await guild.unban(discord.Object(id=action.user_id), reason="Temporary ban expired")
+    except discord.NotFound:
+        # Already unbanned by hand
+        pass
+
+async def apply_mute(member, data):
+    """Time member out for what is left of a long mute and schedule the next renewal"""
+    remaining = datetime.fromtimestamp(data['until'], timezone.utc) - discord.utils.utcnow()
+    if remaining <= timedelta():
+        return
+    await member.timeout(min(remaining, MAX_TIMEOUT), reason=f"{data.get('reason', 'Mute')} (renewed)")
+    if remaining > MAX_TIMEOUT:
+        await scheduler.schedule(
+            'timeout', member.guild.id, member.id,
+            discord.utils.utcnow() + MAX_TIMEOUT - timedelta(minutes=5), data
+        )
+
+@scheduler.handler('timeout')
+async def renew_timeout(action):
+    guild = bot.get_guild(action.guild_id)
+    if guild is None:
+        return
+    data = action.data()
+    if data['until'] <= discord.utils.utcnow().timestamp():
+        return
+    try:
+        member = guild.get_member(action.user_id) or await guild.fetch_member(action.user_id)
+    except discord.NotFound:
+        # Left the server; keep the mute on record until it ends so on_member_join can re-apply it
+        await scheduler.schedule('timeout', guild.id, action.user_id, data['until'], data)
+        return
+    await apply_mute(member, data)
+
+@scheduler.handler('fine_deadline')
+async def fine_deadline_passed(action):
+    # Deadlines fall together at the end of the week; the whole batch shares one enforcement run
+    await fine_enforcer.request()
+
+async def send_command_error(interaction, e):
+    """Report an unexpected error ephemerally, whether or not the interaction was answered yet"""
+    message = f"An error occurred: {str(e)}"
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+
+async def run_purge_slash(interaction, job):
+    view = PurgeCancelView(job, interaction.user.id)
+    await interaction.response.send_message("Starting purge...", view=view, ephemeral=True)
+
+    async def on_progress(job):
+        await interaction.edit_original_response(content=job.summary(), view=None if job.finished else view)
+
+    await job.run(on_progress)
+
 @tree.command(name="clear", description="Clear a specified number of messages")
 @has_manage_server()
 async def clear_slash(interaction: discord.Interaction, amount: int):
     try:
-        if amount <= 0 or amount > 100:
-            await interaction.response.send_message("Please specify a number between 1 and 100", ephemeral=True)
+        if amount <= 0 or amount > PURGE_MAX:
+            await interaction.response.send_message(f"Please specify a number between 1 and {PURGE_MAX}", ephemeral=True)
             return
         
-        await interaction.channel.purge(limit=amount + 1)
-        await interaction.response.send_message(f'Cleared {amount} messages!', ephemeral=True)
+        await run_purge_slash(interaction, PurgeJob(interaction.channel, amount))
     except Exception as e:
-        await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+        await send_command_error(interaction, e)
+
+@tree.command(name="purge", description="Delete messages matching filters")
+@app_commands.describe(
+    amount="Maximum number of messages to delete",
+    user="Only delete messages from this user",
+    contains="Only delete messages matching this regular expression",
+    attachments="Only delete messages with attachments",
+    bots="Only delete messages sent by bots"
+)
+@has_manage_server()
+async def purge_slash(interaction: discord.Interaction, amount: int, user: discord.User = None,
+                      contains: str = None, attachments: bool = False, bots: bool = False):
+    try:
+        if amount <= 0 or amount > PURGE_MAX:
+            await interaction.response.send_message(f"Please specify a number between 1 and {PURGE_MAX}", ephemeral=True)
+            return
+        
+        try:
+            message_filter = PurgeFilter(author=user, pattern=contains, attachments=attachments, bots=bots)
+        except re.error as e:
+            await interaction.response.send_message(f"Invalid regular expression: {e}", ephemeral=True)
+            return
+        
+        await run_purge_slash(interaction, PurgeJob(interaction.channel, amount, message_filter))
+    except Exception as e:
+        await send_command_error(interaction, e)
+
+# Bulk moderation commands
+async def prepare_bulk_targets(interaction, ids, role, joined_within, include_missing=False):
+    """Resolve targets and drop members protected by the role hierarchy.
+
+    Defers the interaction, since chunking or fetching members can outlast the
+    3 second response deadline; callers reply with edit_original_response.
+    """
+    if not ids and role is None and not joined_within:
+        await interaction.response.send_message("Provide user IDs, a role or a join window (minutes)!", ephemeral=True)
+        return None, 0
+
+    await interaction.response.defer(thinking=True)
+    if role is not None or joined_within:
+        await ensure_chunked(interaction.guild)
+    members, missing = resolve_targets(
+        interaction.guild,
+        ids=parse_ids(ids),
+        role=role,
+        joined_within=timedelta(minutes=joined_within) if joined_within else None
+    )
+    try:
+        # Members outside the cache still have to pass the hierarchy check
+        fetched, non_members = await bulk_dispatcher.fetch_members(interaction.guild, missing)
+    except discord.HTTPException as e:
+        await interaction.edit_original_response(content=f"Could not look up members: {e.text or e.status}")
+        return None, 0
+    members.extend(fetched)
+    targets = [member for member in members if check_hierarchy(interaction.user, member) is None]
+    protected = len(members) - len(targets)
+    if include_missing:
+        # Users who already left can still be banned by ID
+        targets.extend(discord.Object(id=user_id) for user_id in non_members)
+    if not targets:
+        await interaction.edit_original_response(content=f"No valid targets found ({protected} protected by role hierarchy).")
+        return None, protected
+    return targets, protected
+
+async def report_bulk_result(interaction, label, result, protected):
+    lines = [f"**{label} finished** - {result.summary()}"]
+    if protected:
+        lines.append(f"{protected} member(s) skipped because of the role hierarchy")
+    if result.errors:
+        lines.append("Errors:\n" + "\n".join(result.errors[:5]))
+    try:
+        await interaction.edit_original_response(content="\n".join(lines))
+    except discord.HTTPException:
+        # The interaction token expires after 15 minutes; post the summary in the channel instead
+        await interaction.channel.send(f"{interaction.user.mention}\n" + "\n".join(lines))
+
+def bulk_progress(interaction, label):
+    async def on_progress(result):
+        await interaction.edit_original_response(content=f"**{label}** - {result.summary()}")
+    return on_progress
+
+@tree.command(name="massban", description="Ban many users at once by ID list, role or join time")
+@app_commands.describe(
+    ids="User IDs separated by spaces or commas",
+    role="Ban every member with this role",
+    joined_within="Ban members who joined within this many minutes",
+    delete_message_hours="Delete messages sent in the last N hours (max 168)"
+)
+@has_manage_server()
+async def massban(interaction: discord.Interaction, ids: str = None, role: discord.Role = None,
+                  joined_within: int = None, reason: str = None, delete_message_hours: int = 0):
+    try:
+        targets, protected = await prepare_bulk_targets(interaction, ids, role, joined_within, include_missing=True)
+        if targets is None:
+            return
+        reason = reason or "Mass ban"
+        await interaction.edit_original_response(content=f"Banning {len(targets)} user(s)...")
+        result = await bulk_dispatcher.ban(
+            interaction.guild, targets, f"{reason} (by {interaction.user})",
+            delete_message_seconds=max(0, min(delete_message_hours, 168)) * 3600,
+            on_progress=bulk_progress(interaction, "Mass ban")
+        )
+        await report_bulk_result(interaction, "Mass ban", result, protected)
+    except Exception as e:
+        await send_command_error(interaction, e)
+
+@tree.command(name="masskick", description="Kick many members at once by ID list, role or join time")
+@app_commands.describe(
+    ids="User IDs separated by spaces or commas",
+    role="Kick every member with this role",
+    joined_within="Kick members who joined within this many minutes"
+)
+@has_manage_server()
+async def masskick(interaction: discord.Interaction, ids: str = None, role: discord.Role = None,
+                   joined_within: int = None, reason: str = None):
+    try:
+        targets, protected = await prepare_bulk_targets(interaction, ids, role, joined_within)
+        if targets is None:
+            return
+        reason = reason or "Mass kick"
+        await interaction.edit_original_response(content=f"Kicking {len(targets)} member(s)...")
+        result = await bulk_dispatcher.kick(
+            targets, f"{reason} (by {interaction.user})",
+            on_progress=bulk_progress(interaction, "Mass kick")
+        )
+        await report_bulk_result(interaction, "Mass kick", result, protected)
+    except Exception as e:
+        await send_command_error(interaction, e)
+
+@tree.command(name="masstimeout", description="Time out many members at once by ID list, role or join time")
+@app_commands.describe(
+    minutes="Timeout length in minutes (max 28 days)",
+    ids="User IDs separated by spaces or commas",
+    role="Time out every member with this role",
+    joined_within="Time out members who joined within this many minutes"
+)
+@has_manage_server()
+async def masstimeout(interaction: discord.Interaction, minutes: int, ids: str = None, role: discord.Role = None,
+                      joined_within: int = None, reason: str = None):
+    try:
+        targets, protected = await prepare_bulk_targets(interaction, ids, role, joined_within)
+        if targets is None:
+            return
+        reason = reason or "Mass timeout"
+        await interaction.edit_original_response(content=f"Timing out {len(targets)} member(s)...")
+        result = await bulk_dispatcher.timeout(
+            targets, timeout_duration(minutes), f"{reason} (by {interaction.user})",
+            on_progress=bulk_progress(interaction, "Mass timeout")
+        )
+        await report_bulk_result(interaction, "Mass timeout", result, protected)
+    except Exception as e:
+        await send_command_error(interaction, e)
 
 # Prefix Commands
 @bot.command(name="kick")
@@ -186,17 +533,14 @@ async def ban_prefix(ctx, member: discord.Member, *, reason: str = None):
 @commands.has_permissions(manage_guild=True)
 async def unban_prefix(ctx, *, member: str):
     try:
-        banned_users = [entry async for entry in ctx.guild.bans()]
-        member_name, member_discriminator = member.split('#')
-
-        for ban_entry in banned_users:
-            user = ban_entry.user
-            if (user.name, user.discriminator) == (member_name, member_discriminator):
-                await ctx.guild.unban(user)
-                await ctx.send(f'Unbanned {user.mention}')
-                return
+        user = await ban_index.find(ctx.guild, member)
+        if user is None:
+            await ctx.send(f"Could not find banned user {member}")
+            return
         
-        await ctx.send(f"Could not find banned user {member}")
+        await ctx.guild.unban(user)
+        ban_index.remove(ctx.guild.id, user.id)
+        await ctx.send(f'Unbanned {user.mention}')
     except Exception as e:
         await ctx.send(f"An error occurred: {str(e)}")
 
@@ -204,12 +548,20 @@ async def unban_prefix(ctx, *, member: str):
 @commands.has_permissions(manage_guild=True)
 async def clear_prefix(ctx, amount: int):
     try:
-        if amount <= 0 or amount > 100:
-            await ctx.send("Please specify a number between 1 and 100")
+        if amount <= 0 or amount > PURGE_MAX:
+            await ctx.send(f"Please specify a number between 1 and {PURGE_MAX}")
             return
         
-        await ctx.channel.purge(limit=amount + 1)
-        await ctx.send(f'Cleared {amount} messages!', delete_after=5)
+        job = PurgeJob(ctx.channel, amount, before=ctx.message)
+        await ctx.message.delete()
+        view = PurgeCancelView(job, ctx.author.id)
+        status = await ctx.send("Starting purge...", view=view)
+        
+        async def on_progress(job):
+            await status.edit(content=job.summary(), view=None if job.finished else view)
+        
+        await job.run(on_progress)
+        await status.delete(delay=5)
     except Exception as e:
         await ctx.send(f"An error occurred: {str(e)}")
 
@@ -254,7 +606,7 @@ async def removemod(interaction: discord.Interaction, member: discord.Member):
 async def addmodrole(interaction: discord.Interaction, role_id: str):
     try:
         role_id = int(role_id)
-        mod_roles = db.get_mod_roles()
+        mod_roles = await db.get_mod_roles()
         
         if role_id in mod_roles:
             await interaction.response.send_message("This role is already a moderator role!", ephemeral=True)
@@ -266,7 +618,7 @@ async def addmodrole(interaction: discord.Interaction, role_id: str):
             await interaction.response.send_message("Role not found!", ephemeral=True)
             return
         
-        db.add_mod_role(role_id)
+        await db.add_mod_role(role_id)
         await interaction.response.send_message(f"Added {role.name} as a moderator role!", ephemeral=True)
     except ValueError:
         await interaction.response.send_message("Invalid role ID! Please provide a valid role ID.", ephemeral=True)
@@ -278,13 +630,13 @@ async def addmodrole(interaction: discord.Interaction, role_id: str):
 async def removemodrole(interaction: discord.Interaction, role_id: str):
     try:
         role_id = int(role_id)
-        mod_roles = db.get_mod_roles()
+        mod_roles = await db.get_mod_roles()
         
         if role_id not in mod_roles:
             await interaction.response.send_message("This role is not a moderator role!", ephemeral=True)
             return
         
-        db.remove_mod_role(role_id)
+        await db.remove_mod_role(role_id)
         
         role = interaction.guild.get_role(role_id)
         role_name = role.name if role else "Unknown Role"
@@ -298,7 +650,7 @@ async def removemodrole(interaction: discord.Interaction, role_id: str):
 @has_manage_server()
 async def listmodroles(interaction: discord.Interaction):
     try:
-        mod_roles = db.get_mod_roles()
+        mod_roles = await db.get_mod_roles()
         if not mod_roles:
             await interaction.response.send_message("No moderator roles have been set up yet!", ephemeral=True)
             return
@@ -320,19 +672,289 @@ async def listmodroles(interaction: discord.Interaction):
     except Exception as e:
         await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
 
+@tree.command(name="dbstatus", description="Show database health and circuit breaker state")
+@has_manage_server()
+async def dbstatus(interaction: discord.Interaction):
+    status = db.status()
+    colors = {
+        'closed': discord.Color.green(),
+        'half-open': discord.Color.orange(),
+        'open': discord.Color.red()
+    }
+    embed = discord.Embed(
+        title="Database Status",
+        color=colors.get(status['circuit'], discord.Color.blue())
+    )
+    embed.add_field(name="Circuit", value=status['circuit'])
+    embed.add_field(name="Consecutive Failures", value=str(status['consecutive_failures']))
+    embed.add_field(name="Times Opened", value=str(status['trips']))
+    embed.add_field(name="Pool Size", value=str(status['pool_size']))
+    embed.add_field(name="Pending Balance Writes", value=str(status['pending_balance_writes']))
+    for namespace, stats in status['cache'].items():
+        lookups = stats['hits'] + stats['misses']
+        hit_ratio = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+        embed.add_field(
+            name=f"Cache: {namespace}",
+            value=f"{hit_ratio} hits, {stats['size']} entries, {stats['evictions']} evicted",
+            inline=False
+        )
+    if status['retry_after']:
+        embed.add_field(name="Next Trial In", value=f"{status['retry_after']:.0f}s")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@tree.command(name="runpayroll", description="Pay job salaries for the current pay period")
+@has_manage_server()
+async def runpayroll(interaction: discord.Interaction):
+    try:
+        await interaction.response.defer(ephemeral=True)
+        result = await payroll.run(interaction.guild)
+        if result.already_paid:
+            await interaction.followup.send(f"Salaries for {result.period} have already been paid.", ephemeral=True)
+            return
+        await interaction.followup.send(
+            f"Paid {result.total} to {result.members} member(s) for {result.period} in {result.elapsed * 1000:.1f}ms",
+            ephemeral=True
+        )
+    except Exception as e:
+        await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+
+@tree.command(name="fines", description="Show a member's recent fines")
+@has_manage_server()
+async def fines_slash(interaction: discord.Interaction, member: discord.Member):
+    try:
+        rows = await db.get_fines(interaction.guild.id, member.id)
+        if not rows:
+            await interaction.response.send_message(f"{member.mention} has no fines.", ephemeral=True)
+            return
+        lines = []
+        for fine_id, amount, issued_by, deadline, status, deducted in rows:
+            due = discord.utils.format_dt(datetime.fromtimestamp(deadline, timezone.utc), 'R')
+            line = f"#{fine_id} - {amount} by <@{issued_by}>, due {due}: {status}"
+            if status == 'enforced':
+                line += f" ({deducted} deducted)"
+            lines.append(line)
+        embed = discord.Embed(title=f"Fines for {member.display_name}", description="\n".join(lines), color=discord.Color.red())
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+
+@tree.command(name="finepaid", description="Mark a member's unpaid fines as paid")
+@has_manage_server()
+async def finepaid_slash(interaction: discord.Interaction, member: discord.Member):
+    try:
+        paid = await db.mark_fines_paid(interaction.guild.id, member.id)
+        if not paid:
+            await interaction.response.send_message(f"{member.mention} has no unpaid fines.", ephemeral=True)
+            return
+        await scheduler.cancel('fine_deadline', interaction.guild.id, member.id)
+        await interaction.response.send_message(f"Marked {len(paid)} fine(s) of {member.mention} as paid.", ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+
+@tree.command(name="addresponse", description="Add or update an auto response")
+@has_manage_server()
+async def addresponse(interaction: discord.Interaction, trigger: str, response: str):
+    try:
+        await auto_responder.add(trigger, response)
+        await interaction.response.send_message(f"Auto response for `{trigger}` saved!", ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+
+@tree.command(name="removeresponse", description="Remove an auto response")
+@has_manage_server()
+async def removeresponse(interaction: discord.Interaction, trigger: str):
+    try:
+        if trigger not in auto_responder.responses:
+            await interaction.response.send_message(f"No auto response found for `{trigger}`", ephemeral=True)
+            return
+        await auto_responder.remove(trigger)
+        await interaction.response.send_message(f"Auto response for `{trigger}` removed!", ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+
+@tree.command(name="ticketpanel", description="Post the ticket panel in this channel")
+@has_manage_server()
+async def ticketpanel(interaction: discord.Interaction, title: str = None, description: str = None, color: str = None):
+    try:
+        await interaction.response.defer(ephemeral=True)
+        if title or description or color:
+            current = await db.get_ticket_panel()
+            await db.set_ticket_panel(
+                title or current['title'],
+                description or current['description'],
+                color or current['color']
+            )
+        await tickets.send_panel(interaction.channel)
+        await interaction.followup.send("Ticket panel posted!", ephemeral=True)
+    except Exception as e:
+        await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+
+@bot.listen('on_message')
+async def auto_respond(message):
+    if message.author.bot or not message.content:
+        return
+    response = auto_responder.respond(message.content)
+    if response:
+        await message.channel.send(response)
+
+@tree.command(name="gatewaystats", description="Show gateway event rates and cache memory for the intent profile")
+@has_manage_server()
+async def gatewaystats(interaction: discord.Interaction):
+    report = gateway_stats.report(bot)
+    embed = discord.Embed(title=f"Gateway Profile: {report['profile']}", color=discord.Color.blue())
+    embed.add_field(name="Intents", value=", ".join(report['intents']) or "none", inline=False)
+    embed.add_field(name="Guilds", value=str(report['guilds']))
+    embed.add_field(name="Cached Members", value=str(report['cached_members']))
+    embed.add_field(name="Cached Users", value=str(report['cached_users']))
+    rss = report['rss_bytes']
+    embed.add_field(name="Memory (RSS)", value=f"{rss / 1024 / 1024:.1f} MiB" if rss else "n/a")
+    embed.add_field(name="Events/min", value=f"{report['events_per_minute']:.1f}")
+    embed.add_field(name="Avoidable Events/min", value=f"{report['avoidable_events_per_minute']:.1f}")
+    if report['top_events']:
+        embed.add_field(
+            name="Top Events",
+            value="\n".join(f"{event}: {rate:.1f}/min" for event, rate in report['top_events']),
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@tree.command(name="shards", description="Show latency and guild count for every shard")
+@has_manage_server()
+async def shards(interaction: discord.Interaction):
+    try:
+        reports = {}
+        if shard_reporter.cluster_id is not None:
+            reports = await shard_reporter.cluster_reports()
+            # This worker's numbers are always current
+            reports[shard_reporter.cluster_id] = {'updated_at': None, 'shards': shard_report(bot)}
+        else:
+            reports[0] = {'updated_at': None, 'shards': shard_report(bot)}
+
+        embed = discord.Embed(title="Shards", color=discord.Color.blue())
+        total_guilds = 0
+        for worker_id, report in sorted(reports.items()):
+            lines = []
+            for shard_id, shard in sorted(report['shards'].items()):
+                # Latency is NaN or infinite until the shard's first heartbeat
+                latency = f"{shard['latency'] * 1000:.0f} ms" if math.isfinite(shard['latency']) else "n/a"
+                lines.append(f"Shard {shard_id}: {latency}, {shard['guilds']} guild(s)")
+                total_guilds += shard['guilds']
+            if len(lines) > 20:
+                # Keep within the embed field limit
+                lines = lines[:20] + [f"... and {len(lines) - 20} more"]
+            name = f"Cluster {worker_id}"
+            if report['updated_at'] is not None:
+                name += f" (reported <t:{int(report['updated_at'])}:R>)"
+            embed.add_field(name=name, value="\n".join(lines) or "No shards", inline=False)
+        embed.set_footer(text=f"{total_guilds} guild(s) in total")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+
+@tree.command(name="stalls", description="Show recent event loop stalls and where they happened")
+@app_commands.describe(show_stack="Attach the stack captured during the most recent stall")
+@has_manage_server()
+async def stalls(interaction: discord.Interaction, show_stack: bool = False):
+    report = watchdog.report()
+    embed = discord.Embed(
+        title="Event Loop Stalls",
+        color=discord.Color.red() if report['stalls'] else discord.Color.green()
+    )
+    embed.add_field(name="Stalls", value=str(report['stalls']))
+    embed.add_field(name="Time Stalled", value=f"{report['stalled_seconds']:.2f}s")
+    embed.add_field(name="Threshold", value=f"{report['threshold'] * 1000:.0f}ms")
+    embed.add_field(name="Loop Lag", value=f"{report['last_lag'] * 1000:.1f}ms (max {report['max_lag'] * 1000:.0f}ms)")
+    if report['top_sites']:
+        embed.add_field(
+            name="Top Call Sites",
+            value="\n".join(f"`{site}` x{count}" for site, count in report['top_sites'])[:1024],
+            inline=False
+        )
+    if report['recent']:
+        embed.add_field(
+            name="Recent",
+            value="\n".join(
+                f"<t:{int(stall['started_at'])}:R> {stall['duration'] * 1000:.0f}ms `{stall['site']}`"
+                for stall in report['recent']
+            )[:1024],
+            inline=False
+        )
+    if show_stack and report['recent']:
+        stack = report['recent'][0]['stack']
+        file = discord.File(io.BytesIO(stack.encode()), filename="stall-stack.txt")
+        await interaction.response.send_message(embed=embed, file=file, ephemeral=True)
+    else:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.event
+async def on_shard_ready(shard_id):
+    logger.info("Shard %s is ready", shard_id)
+
+@bot.event
+async def on_socket_event_type(event_type):
+    gateway_stats.record(event_type)
+
+@bot.event
+async def on_member_join(member):
+    # Members who left during a long mute get the rest of it back
+    mutes = await scheduler.pending('timeout', member.guild.id, member.id)
+    if not mutes:
+        return
+    data = max((action.data() for action in mutes), key=lambda data: data['until'])
+    await scheduler.cancel('timeout', member.guild.id, member.id)
+    await apply_mute(member, data)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    await tickets.channel_deleted(channel.id)
+
+@bot.event
+async def on_member_ban(guild, user):
+    ban_index.add(guild.id, user)
+
+@bot.event
+async def on_member_unban(guild, user):
+    ban_index.remove(guild.id, user.id)
+    # A manual unban ends any temporary ban
+    await scheduler.cancel('unban', guild.id, user.id)
+
+@bot.event
+async def setup_hook():
+    await db.setup()
+    await auto_responder.load()
+    auto_responder.start()
+    await tickets.load()
+    await scheduler.load()
+    scheduler.start()
+    payroll.start()
+    fine_enforcer.start()
+    shard_reporter.start()
+    try:
+        # Each cluster worker listens on its own port
+        await metrics_server.start(offset=cluster_id() or 0)
+    except OSError as e:
+        logger.error("Failed to start metrics server: %s", e)
+    # Runs once per process rather than on every reconnect like on_ready;
+    # in a cluster only the first worker syncs
+    if cluster_id() not in (None, 0):
+        return
+    try:
+        await sync_commands(
+            tree, db,
+            guild_id=sync_guild_id(),
+            force=os.getenv('DISCORD_SYNC_FORCE', 'false').lower() in ('1', 'true', 'yes')
+        )
+    except Exception as e:
+        logger.error("Failed to sync commands: %s", e)
+
 @bot.event
 async def on_ready():
-    print(f'{bot.user} has connected to Discord!')
+    logger.info("%s has connected to Discord!", bot.user)
     # Set status to DND and activity to "NW NIGHT WISCONSIN"
     await bot.change_presence(
         status=discord.Status.dnd,
         activity=discord.Game(name="NW NIGHT WISCONSIN")
     )
-    try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s)")
-    except Exception as e:
-        print(f"Failed to sync commands: {e}")
 
 @bot.event
 async def on_command_error(ctx, error):
@@ -346,5 +968,25 @@ async def on_command_error(ctx, error):
         else:
             await ctx.send("You don't have permission to use this command!")
 
+async def main():
+    loop = asyncio.get_running_loop()
+    try:
+        # Railway stops the worker with SIGTERM; close cleanly so buffered writes are flushed
+        loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(bot.close()))
+    except NotImplementedError:
+        pass
+    if os.getenv('WATCHDOG_ENABLED', 'true').lower() not in ('0', 'false', 'no'):
+        watchdog.start(loop)
+    async with bot:
+        try:
+            await bot.start(os.getenv('DISCORD_TOKEN'))
+        finally:
+            watchdog.stop()
+            await scheduler.stop()
+            await metrics_server.close()
+            await db.close()
+
 # Run the bot
-bot.run(os.getenv('DISCORD_TOKEN')) 
\ No newline at end of file
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(main()) 
\ No newline at end of file
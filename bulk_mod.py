@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from datetime import timedelta
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+ID_PATTERN = re.compile(r'\d{15,20}')
+
+# Discord accepts at most this many users per bulk ban request
+BULK_BAN_CHUNK = 200
+
+
+def parse_ids(text):
+    """Every snowflake in text, in order, without duplicates"""
+    seen = []
+    for match in ID_PATTERN.findall(text or ''):
+        user_id = int(match)
+        if user_id not in seen:
+            seen.append(user_id)
+    return seen
+
+
+def resolve_targets(guild, ids=None, role=None, joined_within=None):
+    """Union of the given IDs, the role's members and members who joined within the window.
+
+    Returns (members, missing_ids) where missing_ids are IDs not in the member cache.
+    """
+    targets = {}
+    missing = []
+    for user_id in ids or ():
+        member = guild.get_member(user_id)
+        if member is None:
+            missing.append(user_id)
+        else:
+            targets[member.id] = member
+    if role is not None:
+        for member in role.members:
+            targets[member.id] = member
+    if joined_within is not None:
+        cutoff = discord.utils.utcnow() - joined_within
+        for member in guild.members:
+            if member.joined_at is not None and member.joined_at >= cutoff:
+                targets[member.id] = member
+    return list(targets.values()), missing
+
+
+def check_hierarchy(moderator, member):
+    """Reason the moderator or the bot may not act on member, or None"""
+    guild = member.guild
+    if member.id == guild.owner_id:
+        return "server owner"
+    if member.id == moderator.id:
+        return "yourself"
+    if member.id == guild.me.id:
+        return "the bot"
+    if member.top_role >= moderator.top_role:
+        return "higher or equal role"
+    if member.top_role >= guild.me.top_role:
+        return "above the bot's role"
+    return None
+
+
+class BulkResult:
+    def __init__(self, total):
+        self.total = total
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.errors = []
+
+    @property
+    def done(self):
+        return self.succeeded + self.failed + self.skipped
+
+    def summary(self):
+        return (f"{self.done}/{self.total} processed: {self.succeeded} succeeded, "
+                f"{self.failed} failed, {self.skipped} skipped")
+
+
+class BulkDispatcher:
+    """Runs one moderation action over many targets with bounded concurrency.
+
+    discord.py already queues requests per rate-limit bucket and retries 429s;
+    the semaphore keeps us from flooding that queue (and the global limit)
+    with thousands of requests at once during a raid.
+    """
+
+    def __init__(self, concurrency=None, progress_interval=None):
+        self.concurrency = concurrency or int(os.getenv('BULK_MOD_CONCURRENCY', '5'))
+        self.progress_interval = progress_interval or float(os.getenv('BULK_MOD_PROGRESS_INTERVAL', '2'))  # seconds
+
+    @staticmethod
+    async def report(on_progress, result):
+        """Call on_progress(result); returns False once progress can no longer be shown"""
+        try:
+            await on_progress(result)
+            return True
+        except discord.HTTPException as e:
+            # Usually the interaction token expired on a long raid cleanup; keep going without updates
+            logger.warning("Stopped bulk action progress updates: %s", e)
+            return False
+
+    async def run(self, targets, action, on_progress=None):
+        """Await action(target) for every target, reporting progress along the way"""
+        result = BulkResult(len(targets))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        last_report = time.monotonic()
+
+        async def worker(target):
+            nonlocal last_report, on_progress
+            async with semaphore:
+                try:
+                    await action(target)
+                    result.succeeded += 1
+                except discord.NotFound:
+                    result.skipped += 1
+                except discord.HTTPException as e:
+                    result.failed += 1
+                    result.errors.append(f"{getattr(target, 'id', target)}: {e.text or e.status}")
+            if on_progress is not None and time.monotonic() - last_report >= self.progress_interval:
+                last_report = time.monotonic()
+                if not await self.report(on_progress, result):
+                    on_progress = None
+
+        await asyncio.gather(*(worker(target) for target in targets))
+        return result
+
+    async def ban(self, guild, users, reason, delete_message_seconds=0, on_progress=None):
+        """Ban users through Discord's bulk ban endpoint, up to 200 per request"""
+        result = BulkResult(len(users))
+        for start in range(0, len(users), BULK_BAN_CHUNK):
+            chunk = users[start:start + BULK_BAN_CHUNK]
+            try:
+                response = await guild.bulk_ban(chunk, reason=reason, delete_message_seconds=delete_message_seconds)
+                result.succeeded += len(response.banned)
+                result.failed += len(response.failed)
+            except discord.HTTPException as e:
+                result.failed += len(chunk)
+                result.errors.append(f"bulk ban: {e.text or e.status}")
+            if on_progress is not None and not await self.report(on_progress, result):
+                on_progress = None
+        return result
+
+    async def fetch_members(self, guild, user_ids):
+        """Look up IDs missing from the member cache over the API.
+
+        Returns (members, non_member_ids). Only a 404 means the user is not in
+        the guild; other errors are raised so nobody skips the hierarchy check.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        members = []
+        non_members = []
+
+        async def lookup(user_id):
+            async with semaphore:
+                try:
+                    members.append(await guild.fetch_member(user_id))
+                except discord.NotFound:
+                    non_members.append(user_id)
+
+        await asyncio.gather(*(lookup(user_id) for user_id in user_ids))
+        return members, non_members
+
+    async def kick(self, members, reason, on_progress=None):
+        return await self.run(members, lambda member: member.kick(reason=reason), on_progress)
+
+    async def timeout(self, members, duration, reason, on_progress=None):
+        return await self.run(members, lambda member: member.timeout(duration, reason=reason), on_progress)
+
+
+def timeout_duration(minutes):
+    # Discord refuses timeouts of 28 days or more
+    return timedelta(minutes=max(1, min(minutes, 28 * 24 * 60 - 1)))
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class Cache:
+    """Thread-safe in-process cache split into namespaces.
+
+    Each namespace has its own TTL and optional LRU bound. Writers call
+    invalidate(), which drops entries and bumps the namespace version; a load
+    that started before the bump is not stored, so a slow read racing a write
+    can never cache stale data. Expired entries are kept until replaced or
+    evicted so they can still be served with allow_stale during an outage.
+    """
+
+    def __init__(self):
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def configure(self, namespace, ttl=None, max_entries=None):
+        """Register a namespace; ttl is in seconds, None means until invalidated"""
+        with self._lock:
+            self._namespaces[namespace] = {
+                'ttl': ttl,
+                'max_entries': max_entries,
+                'entries': OrderedDict(),  # key -> (value, expires_at)
+                'version': 0,
+                'hits': 0,
+                'misses': 0,
+                'evictions': 0,
+                'invalidations': 0,
+            }
+
+    def get(self, namespace, key=None, allow_stale=False):
+        """Return (found, value) for key"""
+        with self._lock:
+            ns = self._namespaces[namespace]
+            entry = ns['entries'].get(key)
+            if entry is not None and (allow_stale or entry[1] is None or entry[1] > time.monotonic()):
+                ns['entries'].move_to_end(key)
+                if not allow_stale:
+                    ns['hits'] += 1
+                return True, entry[0]
+            if not allow_stale:
+                ns['misses'] += 1
+            return False, None
+
+    def version(self, namespace):
+        with self._lock:
+            return self._namespaces[namespace]['version']
+
+    def set(self, namespace, key, value, version=None):
+        """Store value.
+
+        Writers omit version: the write is authoritative and, like invalidate(),
+        stops in-flight loads from overwriting it. Loaders pass the version they
+        read before querying and are skipped if the namespace changed since.
+        """
+        with self._lock:
+            ns = self._namespaces[namespace]
+            if version is None:
+                ns['version'] += 1
+            elif version != ns['version']:
+                return False
+            expires_at = time.monotonic() + ns['ttl'] if ns['ttl'] is not None else None
+            ns['entries'][key] = (value, expires_at)
+            ns['entries'].move_to_end(key)
+            if ns['max_entries'] is not None:
+                while len(ns['entries']) > ns['max_entries']:
+                    ns['entries'].popitem(last=False)
+                    ns['evictions'] += 1
+            return True
+
+    def get_or_load(self, namespace, key, loader):
+        """Return the cached value for key, calling loader() on a miss"""
+        found, value = self.get(namespace, key)
+        if found:
+            return value
+        version = self.version(namespace)
+        value = loader()
+        self.set(namespace, key, value, version=version)
+        return value
+
+    def invalidate(self, namespace, keys=None):
+        """Drop the given keys, or the whole namespace if keys is None"""
+        with self._lock:
+            ns = self._namespaces[namespace]
+            ns['version'] += 1
+            ns['invalidations'] += 1
+            if keys is None:
+                ns['entries'].clear()
+            else:
+                for key in keys:
+                    ns['entries'].pop(key, None)
+
+    def stats(self):
+        """Counters per namespace"""
+        with self._lock:
+            return {
+                name: {
+                    'size': len(ns['entries']),
+                    'hits': ns['hits'],
+                    'misses': ns['misses'],
+                    'evictions': ns['evictions'],
+                    'invalidations': ns['invalidations'],
+                }
+                for name, ns in self._namespaces.items()
+            }
@@ -0,0 +1,149 @@
+"""Run the bot as several worker processes, each owning a contiguous range of shards.
+
+    python cluster.py
+
+Every worker is a normal bot.py process started with CLUSTER_ID, SHARD_COUNT
+and SHARD_IDS set, talking to the same database. Workers that exit are
+restarted; SIGTERM or Ctrl+C stops them all.
+"""
+import json
+import logging
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+from dotenv import load_dotenv
+
+from database import Database
+from logs import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Discord allows one IDENTIFY per rate limit bucket every 5 seconds
+IDENTIFY_INTERVAL = 5
+
+
+def gateway_info(token):
+    """(recommended shard count, identify max_concurrency) from Discord"""
+    request = urllib.request.Request(
+        'https://discord.com/api/v10/gateway/bot',
+        headers={'Authorization': f'Bot {token}', 'User-Agent': 'DiscordBot (cluster launcher)'}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        data = json.load(response)
+    return data['shards'], data['session_start_limit']['max_concurrency']
+
+
+def shard_ranges(shard_count, workers):
+    """Split shard IDs 0..shard_count-1 into at most `workers` contiguous ranges"""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+class Cluster:
+    def __init__(self, shard_count, workers, max_concurrency=1):
+        self.shard_count = shard_count
+        self.ranges = shard_ranges(shard_count, workers)
+        self.max_concurrency = max_concurrency
+        self.restart_delay = float(os.getenv('CLUSTER_RESTART_DELAY', '10'))  # seconds
+        self.processes = {}
+        self.stopping = False
+
+    def worker_env(self, cluster_id):
+        env = dict(os.environ)
+        env.update({
+            'CLUSTER_ID': str(cluster_id),
+            'SHARD_COUNT': str(self.shard_count),
+            'SHARD_IDS': ','.join(str(shard_id) for shard_id in self.ranges[cluster_id]),
+        })
+        # Balances are shared across workers, so skip write-behind and balance
+        # caching unless explicitly configured; one process's buffer would be
+        # invisible to the others
+        env.setdefault('BALANCE_FLUSH_THRESHOLD', '1')
+        env.setdefault('CACHE_BALANCE_TTL', '0')
+        return env
+
+    def spawn(self, cluster_id):
+        shards = self.ranges[cluster_id]
+        logger.info("Starting cluster %s with shards %s-%s", cluster_id, shards[0], shards[-1])
+        self.processes[cluster_id] = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')],
+            env=self.worker_env(cluster_id)
+        )
+
+    def identify_time(self, cluster_id):
+        # Each worker identifies its shards back to back; give it time to finish
+        # before the next worker starts so they don't collide in the same buckets
+        return IDENTIFY_INTERVAL * math.ceil(len(self.ranges[cluster_id]) / self.max_concurrency)
+
+    def start(self):
+        for cluster_id in range(len(self.ranges)):
+            if self.stopping:
+                return
+            self.spawn(cluster_id)
+            if cluster_id < len(self.ranges) - 1:
+                time.sleep(self.identify_time(cluster_id))
+
+    def stop(self, *args):
+        self.stopping = True
+        for process in self.processes.values():
+            if process.poll() is None:
+                process.terminate()
+
+    def watch(self):
+        """Restart workers that exit until stop() is called, then wait for all of them"""
+        restart_at = {}
+        while not self.stopping:
+            for cluster_id, process in self.processes.items():
+                code = process.poll()
+                if code is None or cluster_id in restart_at:
+                    continue
+                logger.warning("Cluster %s exited with code %s, restarting in %.0fs", cluster_id, code, self.restart_delay)
+                restart_at[cluster_id] = time.monotonic() + self.restart_delay
+            for cluster_id, when in list(restart_at.items()):
+                if time.monotonic() >= when and not self.stopping:
+                    del restart_at[cluster_id]
+                    self.spawn(cluster_id)
+            time.sleep(1)
+        for process in self.processes.values():
+            process.wait()
+
+
+def main():
+    load_dotenv()
+    setup_logging()
+    token = os.getenv('DISCORD_TOKEN')
+    shard_count = int(os.getenv('CLUSTER_SHARD_COUNT', '0'))
+    max_concurrency = 1
+    if not shard_count:
+        shard_count, max_concurrency = gateway_info(token)
+    workers = int(os.getenv('CLUSTER_WORKERS', '0')) or os.cpu_count() or 1
+
+    # Apply migrations once here so workers don't race each other on startup
+    database = Database()
+    try:
+        database.migrate()
+    finally:
+        database.close()
+
+    cluster = Cluster(shard_count, workers, max_concurrency)
+    logger.info("Running %s shard(s) across %s worker(s)", shard_count, len(cluster.ranges))
+    signal.signal(signal.SIGTERM, cluster.stop)
+    signal.signal(signal.SIGINT, cluster.stop)
+    cluster.start()
+    cluster.watch()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import hashlib
+import json
+import logging
+import os
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+def sync_guild_id():
+    """Guild to sync commands to instead of globally (DISCORD_SYNC_GUILD_ID), or None"""
+    return int(os.getenv('DISCORD_SYNC_GUILD_ID', '0')) or None
+
+
+def command_payload(tree, guild=None):
+    """The JSON payload tree.sync() would upload for the given scope"""
+    return [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+
+
+def payload_hash(payload):
+    # Sort so the hash only changes when the commands do, not their registration order
+    data = json.dumps(sorted(payload, key=lambda command: (command.get('type', 1), command['name'])), sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+async def sync_commands(tree, db, guild_id=None, force=False):
+    """Sync the command tree only when its payload changed since the last sync.
+
+    With guild_id the global commands are copied to that guild and synced
+    there, which propagates instantly and is meant for development. Returns the
+    number of synced commands, or None when the stored hash was current.
+    """
+    guild = discord.Object(id=guild_id) if guild_id else None
+    if guild is not None:
+        tree.copy_global_to(guild=guild)
+
+    digest = payload_hash(command_payload(tree, guild))
+    state_key = f"command_hash:{guild_id}" if guild_id else "command_hash:global"
+    if not force and await db.get_state(state_key) == digest:
+        logger.info("Command tree unchanged, skipping sync (%s)", state_key)
+        return None
+
+    synced = await tree.sync(guild=guild)
+    await db.set_state(state_key, digest)
+    logger.info("Synced %s command(s) (%s)", len(synced), state_key)
+    return len(synced)
@@ -1,359 +1,317 @@
 import os
-import sqlitecloud
+import logging
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import time
+from contextlib import contextmanager
+from backends import get_backend
+from cache import Cache
+from migrations import MIGRATIONS
+from pool import ConnectionOpenError, ConnectionPool
+from retry import CircuitBreaker, RetryPolicy
+from write_behind import BalanceWriteBuffer, RowWriteBuffer
+from logs import sample
+from metrics import DB_QUERY_SECONDS
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-class Database:
-    def __init__(self):
-        self.conn = None
-        self.cursor = None
-        self.max_retries = 3
-        self.retry_delay = 1  # seconds
-        self.cache = {
-            'auto_responses': {},
-            'mod_roles': [],
-            'jobs': {},
-            'cache_time': {}
-        }
-        self.cache_duration = 5  # Reduced cache duration to 5 seconds
-        self.connect()
-        self.create_tables()
-
-    def connect(self):
-        """Connect to the SQLiteCloud database with retry logic"""
-        retries = 0
-        while retries < self.max_retries:
-            try:
-                # Get credentials from environment variables
-                host = os.getenv('SQLITECLOUD_HOST', 'ccnvo0ujhk.g4.sqlite.cloud')
-                port = os.getenv('SQLITECLOUD_PORT', '8860')
-                database = os.getenv('SQLITECLOUD_DB', 'chinook.sqlite')
-                apikey = os.getenv('SQLITECLOUD_API_KEY', 'pk8J7e64Pt8yfjaYeR5S6L9Emj0CwZw8RYBno8fi7p4')
-                
-                print(f"Attempting to connect to SQLiteCloud (attempt {retries + 1}/{self.max_retries})")
-                
-                # Construct connection URL
-                connection_url = f"sqlitecloud://{host}:{port}/{database}?apikey={apikey}"
-                
-                # Close existing connection if it exists
-                if self.conn:
-                    try:
-                        self.conn.close()
-                    except:
-                        pass
-                
-                # Open the connection to SQLite Cloud
-                self.conn = sqlitecloud.connect(connection_url)
-                self.cursor = self.conn.cursor()
-                
-                # Test the connection
-                self.cursor.execute("SELECT 1")
-                result = self.cursor.fetchone()
-                if result and result[0] == 1:
-                    print("Successfully connected to SQLiteCloud database")
-                    return True
-                else:
-                    raise Exception("Connection test failed")
-                    
-            except Exception as e:
-                print(f"Error connecting to SQLiteCloud database (attempt {retries + 1}): {str(e)}")
-                retries += 1
-                if retries < self.max_retries:
-                    print(f"Retrying in {self.retry_delay} seconds...")
-                    time.sleep(self.retry_delay)
-                else:
-                    print("Max retries reached. Could not connect to database.")
-                    raise
-
-    def ensure_connection(self):
-        """Ensure database connection is active, reconnect if necessary"""
-        try:
-            # Test the connection
-            self.cursor.execute("SELECT 1")
-            self.cursor.fetchone()
-        except:
-            print("Connection lost, attempting to reconnect...")
-            self.connect()
-
-    def execute_with_retry(self, query, params=None):
-        """Execute a query with retry logic"""
-        retries = 0
-        while retries < self.max_retries:
-            try:
-                self.ensure_connection()
-                if params:
-                    self.cursor.execute(query, params)
-                else:
-                    self.cursor.execute(query)
-                return True
-            except Exception as e:
-                print(f"Error executing query (attempt {retries + 1}): {str(e)}")
-                retries += 1
-                if retries < self.max_retries:
-                    print(f"Retrying in {self.retry_delay} seconds...")
-                    time.sleep(self.retry_delay)
-                    self.connect()
-                else:
-                    print("Max retries reached. Query failed.")
-                    raise
-
-    def commit_with_retry(self):
-        """Commit changes with retry logic"""
-        retries = 0
-        while retries < self.max_retries:
-            try:
-                self.ensure_connection()
-                self.conn.commit()
-                return True
-            except Exception as e:
-                print(f"Error committing changes (attempt {retries + 1}): {str(e)}")
-                retries += 1
-                if retries < self.max_retries:
-                    print(f"Retrying in {self.retry_delay} seconds...")
-                    time.sleep(self.retry_delay)
-                    self.connect()
-                else:
-                    print("Max retries reached. Commit failed.")
-                    raise
-
-    def create_tables(self):
-        """Create necessary tables if they don't exist"""
-        try:
-            # Economy table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS economy (
-                    user_id INTEGER PRIMARY KEY,
-                    balance INTEGER DEFAULT 0
-                )
-            ''')
-
-            # Mod roles table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mod_roles (
-                    role_id INTEGER PRIMARY KEY
-                )
-            ''')
-
-            # Ticket panel settings table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ticket_panel (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT,
-                    description TEXT,
-                    color TEXT
-                )
-            ''')
-
-            # Auto responder table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS auto_responder (
-                    trigger TEXT PRIMARY KEY,
-                    response TEXT
-                )
-            ''')
+# Per-call debug logging on the balance paths keeps 1 record in 100
+HOT_PATH = sample(100)
 
-            # Daily cooldown table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS daily_cooldown (
-                    user_id INTEGER PRIMARY KEY,
-                    last_claim TEXT
-                )
-            ''')
-
-            # Jobs table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS jobs (
-                    role_id INTEGER PRIMARY KEY,
-                    salary INTEGER
-                )
-            ''')
-
-            # Tickets table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tickets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    channel_id INTEGER,
-                    created_at TEXT,
-                    closed_at TEXT
-                )
-            ''')
+load_dotenv()
 
-            # Ticket logs table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ticket_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ticket_id INTEGER,
-                    action TEXT,
-                    timestamp TEXT,
-                    details TEXT
-                )
-            ''')
+class InsufficientFundsError(Exception):
+    """Raised when a balance change would take a user below zero"""
 
-            self.conn.commit()
-            print("Tables created successfully")
-        except Exception as e:
-            print(f"Error creating tables: {e}")
-            self.conn.rollback()
-            raise
 
-    def check_and_create_tables(self):
-        """Check if all required tables exist and create them if they don't"""
+class Database:
+    """Blocking data access layer.
+
+    Each query makes a single attempt on a pooled connection and raises on
+    failure; retries, backoff and the circuit breaker live in AsyncDatabase so
+    they never sleep on a worker thread or the event loop.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else get_backend()
+        self.cache = Cache()
+        # Admin-managed data only changes through the writers below, which invalidate it;
+        # the TTL just bounds staleness from writes made by other processes
+        self.cache.configure('mod_roles', ttl=300)
+        self.cache.configure('jobs', ttl=300)
+        self.cache.configure('auto_responses', ttl=300)
+        self.cache.configure(
+            'balances',
+            ttl=float(os.getenv('CACHE_BALANCE_TTL', '60')),
+            max_entries=int(os.getenv('CACHE_BALANCE_MAX', '10000'))
+        )
+        self.pool = ConnectionPool(self.backend.connect)
+        self.balance_buffer = BalanceWriteBuffer()
+        self.ticket_log_buffer = RowWriteBuffer()
+        self._ticket_log_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self, begin=None):
+        """Yield a cursor on a pooled connection, committing on success and rolling back on error.
+
+        begin is an explicit statement opening the transaction, such as
+        'BEGIN IMMEDIATE' to take the write lock before the first read; by
+        default the driver only starts one at the first write.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if begin:
+                    cursor.execute(begin)
+                yield cursor
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+
+    def run_in_transaction(self, operation, begin=None):
+        """Run operation(cursor) inside a single transaction and return its result"""
+        with self.transaction(begin) as cursor:
+            return operation(cursor)
+
+    def execute(self, query, params=None):
+        """Execute and commit a write query, returning the last inserted row id"""
+        def operation(cursor):
+            cursor.execute(query, params or ())
+            return cursor.lastrowid
+        return self.run_in_transaction(operation)
+
+    def fetchone(self, query, params=None):
+        """Execute a read query and return its first row"""
+        def operation(cursor):
+            cursor.execute(query, params or ())
+            return cursor.fetchone()
+        return self.run_in_transaction(operation)
+
+    def fetchall(self, query, params=None):
+        """Execute a read query and return all rows"""
+        def operation(cursor):
+            cursor.execute(query, params or ())
+            return cursor.fetchall()
+        return self.run_in_transaction(operation)
+
+    def migrate(self):
+        """Apply pending schema migrations in order; run once at startup"""
         try:
-            # Check and create economy table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS economy (
-                    user_id INTEGER PRIMARY KEY,
-                    balance INTEGER DEFAULT 0
-                )
-            ''')
-
-            # Check and create mod_roles table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mod_roles (
-                    role_id INTEGER PRIMARY KEY
-                )
-            ''')
-
-            # Check and create ticket_panel table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ticket_panel (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT,
-                    description TEXT,
-                    color TEXT
-                )
-            ''')
-
-            # Check and create auto_responder table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS auto_responder (
-                    trigger TEXT PRIMARY KEY,
-                    response TEXT
-                )
-            ''')
-
-            # Check and create daily_cooldown table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS daily_cooldown (
-                    user_id INTEGER PRIMARY KEY,
-                    last_claim TEXT
-                )
-            ''')
-
-            # Check and create jobs table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS jobs (
-                    role_id INTEGER PRIMARY KEY,
-                    salary INTEGER
-                )
-            ''')
-
-            # Check and create tickets table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tickets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    channel_id INTEGER,
-                    created_at TEXT,
-                    closed_at TEXT
-                )
-            ''')
-
-            # Check and create ticket_logs table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ticket_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ticket_id INTEGER,
-                    action TEXT,
-                    timestamp TEXT,
-                    details TEXT
-                )
-            ''')
-
-            self.conn.commit()
-            print("All required tables verified and created if needed")
+            with self.transaction() as cursor:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT,
+                        applied_at TEXT
+                    )
+                ''')
+                cursor.execute('SELECT MAX(version) FROM schema_version')
+                current = cursor.fetchone()[0] or 0
+
+            applied = []
+            for version, description, statements in MIGRATIONS:
+                if version <= current:
+                    continue
+                # sqlite3 runs DDL in autocommit unless a transaction is already open,
+                # so BEGIN explicitly to keep each migration atomic with its version row
+                with self.transaction(begin='BEGIN') as cursor:
+                    for statement in statements:
+                        cursor.execute(statement)
+                    cursor.execute('''
+                        INSERT INTO schema_version (version, description, applied_at)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT (version) DO NOTHING
+                    ''', (version, description, datetime.now().isoformat()))
+                logger.info("Applied migration %s: %s", version, description)
+                applied.append(version)
+
+            logger.info("Database schema at version %s", max([current] + applied))
+            return applied
         except Exception as e:
-            print(f"Error checking/creating tables: {str(e)}")
-            self.conn.rollback()
+            logger.error("Error migrating database: %s", e)
             raise
 
     # Economy methods
     def get_balance(self, user_id):
         try:
-            print(f"Attempting to get balance for user {user_id}")
-            self.cursor.execute('SELECT balance FROM economy WHERE user_id = ?', (user_id,))
-            result = self.cursor.fetchone()
-            balance = result[0] if result else 0
-            print(f"Retrieved balance for user {user_id}: {balance}")
+            balance = self.balance_buffer.get(user_id)
+            if balance is None:
+                balance = self.cache.get_or_load('balances', user_id, lambda: self._load_balance(user_id))
+            logger.debug("Balance for user %s: %s", user_id, balance, extra=HOT_PATH)
             return balance
         except Exception as e:
-            print(f"Error getting balance: {str(e)}")
-            print("Current connection status:", "Connected" if self.conn else "Disconnected")
-            return 0
+            logger.error("Error getting balance: %s", e)
+            raise
+
+    def _load_balance(self, user_id):
+        result = self.fetchone('SELECT balance FROM economy WHERE user_id = ?', (user_id,))
+        return result[0] if result else 0
 
     def set_balance(self, user_id, amount):
+        """Buffer a balance write; it reaches the database on the next flush"""
+        logger.debug("Buffering balance for user %s: %s", user_id, amount, extra=HOT_PATH)
+        self.cache.set('balances', user_id, amount)
+        if self.balance_buffer.put(user_id, amount):
+            self.flush_balances()
+
+    def flush_balances(self):
+        """Write every buffered balance in one transaction and return how many rows were written"""
+        return self.run_balance_transaction(None)
+
+    def run_balance_transaction(self, operation, begin=None):
+        """Run operation(cursor) in the same transaction as a flush of buffered balances.
+
+        Returns the number of flushed rows when operation is None, otherwise the
+        operation's result.
+        """
+        with self._flush_lock:
+            pending = self.balance_buffer.begin_flush()
+            if not pending and operation is None:
+                self.balance_buffer.end_flush(True)
+                return 0
+
+            def combined(cursor):
+                if pending:
+                    cursor.executemany('''
+                        INSERT INTO economy (user_id, balance)
+                        VALUES (?, ?)
+                        ON CONFLICT (user_id) DO UPDATE SET balance = excluded.balance
+                    ''', list(pending.items()))
+                if operation is None:
+                    return len(pending)
+                return operation(cursor)
+
+            try:
+                result = self.run_in_transaction(combined, begin)
+            except Exception as e:
+                self.balance_buffer.end_flush(False)
+                if pending:
+                    logger.error("Error flushing %s balance(s): %s", len(pending), e)
+                raise
+            self.balance_buffer.end_flush(True)
+            if pending:
+                logger.debug("Flushed %s balance(s)", len(pending))
+            return result
+
+    def add_balance(self, user_id, delta):
+        """Atomically add delta (may be negative) to a balance and return the new balance.
+
+        Raises InsufficientFundsError instead of letting the balance go below zero.
+        """
+        def operation(cursor):
+            if delta < 0:
+                cursor.execute('''
+                    UPDATE economy SET balance = balance + ?
+                    WHERE user_id = ? AND balance + ? >= 0
+                ''', (delta, user_id, delta))
+                if cursor.rowcount == 0:
+                    raise InsufficientFundsError(f"User {user_id} cannot afford {-delta}")
+            else:
+                cursor.execute('''
+                    INSERT INTO economy (user_id, balance)
+                    VALUES (?, ?)
+                    ON CONFLICT (user_id) DO UPDATE SET balance = balance + excluded.balance
+                ''', (user_id, delta))
+            cursor.execute('SELECT balance FROM economy WHERE user_id = ?', (user_id,))
+            return cursor.fetchone()[0]
         try:
-            print(f"Attempting to set balance for user {user_id} to {amount}")
-            self.execute_with_retry('''
+            balance = self.run_balance_transaction(operation)
+        except Exception:
+            self.cache.invalidate('balances', [user_id])
+            raise
+        self.cache.set('balances', user_id, balance)
+        return balance
+
+    def transfer(self, from_user_id, to_user_id, amount):
+        """Atomically move amount between two users, refusing to overdraw the sender"""
+        if amount <= 0:
+            raise ValueError("Transfer amount must be positive")
+        if from_user_id == to_user_id:
+            raise ValueError("Cannot transfer to the same user")
+
+        def operation(cursor):
+            cursor.execute('''
+                UPDATE economy SET balance = balance - ?
+                WHERE user_id = ? AND balance >= ?
+            ''', (amount, from_user_id, amount))
+            if cursor.rowcount == 0:
+                raise InsufficientFundsError(f"User {from_user_id} cannot afford {amount}")
+            cursor.execute('''
                 INSERT INTO economy (user_id, balance)
                 VALUES (?, ?)
-                ON CONFLICT (user_id) DO UPDATE SET balance = ?
-            ''', (user_id, amount, amount))
-            self.commit_with_retry()
-            print(f"Successfully set balance for user {user_id}")
-        except Exception as e:
-            print(f"Error setting balance: {str(e)}")
-            print("Current connection status:", "Connected" if self.conn else "Disconnected")
-            raise
+                ON CONFLICT (user_id) DO UPDATE SET balance = balance + excluded.balance
+            ''', (to_user_id, amount))
+        try:
+            self.run_balance_transaction(operation)
+        finally:
+            self.cache.invalidate('balances', [from_user_id, to_user_id])
+
+    def apply_deltas(self, deltas):
+        """Apply {user_id: delta} to many balances in one transaction and return the row count.
+
+        Balances are not clamped; callers deducting money must size their deltas.
+        """
+        rows = [(user_id, delta) for user_id, delta in deltas.items() if delta]
+        if not rows:
+            return 0
+
+        def operation(cursor):
+            cursor.executemany('''
+                INSERT INTO economy (user_id, balance)
+                VALUES (?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET balance = balance + excluded.balance
+            ''', rows)
+            return len(rows)
+        try:
+            return self.run_balance_transaction(operation)
+        finally:
+            self.cache.invalidate('balances', [user_id for user_id, _ in rows])
 
     # Mod roles methods
     def get_mod_roles(self):
         """Get mod roles with caching"""
-        if self.is_cache_valid('mod_roles'):
-            return self.cache['mod_roles']
-        
         try:
-            self.ensure_connection()
-            self.cursor.execute('SELECT role_id FROM mod_roles')
-            roles = [row[0] for row in self.cursor.fetchall()]
-            self.update_cache('mod_roles', roles)
-            return roles
+            return self.cache.get_or_load(
+                'mod_roles', None,
+                lambda: [row[0] for row in self.fetchall('SELECT role_id FROM mod_roles')]
+            )
         except Exception as e:
-            print(f"Error getting mod roles: {e}")
-            return self.cache['mod_roles']  # Return cached data if available
+            logger.error("Error getting mod roles: %s", e)
+            raise
 
     def add_mod_role(self, role_id):
         try:
-            self.cursor.execute('INSERT INTO mod_roles (role_id) VALUES (?) ON CONFLICT DO NOTHING', (role_id,))
-            self.conn.commit()
+            self.execute('INSERT INTO mod_roles (role_id) VALUES (?) ON CONFLICT DO NOTHING', (role_id,))
+            self.cache.invalidate('mod_roles')
         except Exception as e:
-            print(f"Error adding mod role: {e}")
-            self.conn.rollback()
+            logger.error("Error adding mod role: %s", e)
+            raise
 
     def remove_mod_role(self, role_id):
         try:
-            self.cursor.execute('DELETE FROM mod_roles WHERE role_id = ?', (role_id,))
-            self.conn.commit()
+            self.execute('DELETE FROM mod_roles WHERE role_id = ?', (role_id,))
+            self.cache.invalidate('mod_roles')
         except Exception as e:
-            print(f"Error removing mod role: {e}")
-            self.conn.rollback()
+            logger.error("Error removing mod role: %s", e)
+            raise
 
     # Ticket panel methods
     def get_ticket_panel(self, panel_id: int = None):
         try:
-            # Ensure the table exists
-            self.check_and_create_tables()
-            
             if panel_id is not None:
-                self.cursor.execute('SELECT id, title, description, color FROM ticket_panel WHERE id = ?', (panel_id,))
+                result = self.fetchone('SELECT id, title, description, color FROM ticket_panel WHERE id = ?', (panel_id,))
             else:
-                self.cursor.execute('SELECT id, title, description, color FROM ticket_panel ORDER BY id DESC LIMIT 1')
+                result = self.fetchone('SELECT id, title, description, color FROM ticket_panel ORDER BY id DESC LIMIT 1')
             
-            result = self.cursor.fetchone()
             if result:
                 return {
                     "id": result[0],
@@ -368,220 +326,608 @@ class Database:
                 "color": "blue"
             }
         except Exception as e:
-            print(f"Error getting ticket panel: {str(e)}")
-            return {
-                "id": 0,
-                "title": "Support Ticket System",
-                "description": "Click the button below to create a new support ticket. A moderator will assist you shortly.",
-                "color": "blue"
-            }
+            logger.error("Error getting ticket panel: %s", e)
+            raise
 
     def set_ticket_panel(self, title, description, color):
         try:
-            # Ensure the table exists
-            self.check_and_create_tables()
-            
-            self.cursor.execute('''
+            # Returns the ID of the newly created panel
+            return self.execute('''
                 INSERT INTO ticket_panel (title, description, color)
                 VALUES (?, ?, ?)
             ''', (title, description, color))
-            self.conn.commit()
-            
-            # Get the ID of the newly created panel
-            self.cursor.execute('SELECT last_insert_rowid()')
-            panel_id = self.cursor.fetchone()[0]
-            return panel_id
         except Exception as e:
-            print(f"Error setting ticket panel: {str(e)}")
-            self.conn.rollback()
-            return None
+            logger.error("Error setting ticket panel: %s", e)
+            raise
 
     def list_ticket_panels(self):
         try:
-            # Ensure the table exists
-            self.check_and_create_tables()
-            
-            self.cursor.execute('SELECT id, title FROM ticket_panel ORDER BY id DESC')
-            return self.cursor.fetchall()
+            return self.fetchall('SELECT id, title FROM ticket_panel ORDER BY id DESC')
         except Exception as e:
-            print(f"Error listing ticket panels: {str(e)}")
-            return []
+            logger.error("Error listing ticket panels: %s", e)
+            raise
 
     # Auto responder methods
     def get_auto_responses(self):
         """Get auto responses with caching"""
+        def load():
+            rows = self.fetchall('SELECT trigger, response FROM auto_responder')
+            logger.debug("Loaded %s auto responses", len(rows))
+            return {row[0]: row[1] for row in rows}
+
         try:
-            print("Fetching auto responses from database...")
-            self.ensure_connection()
-            self.cursor.execute('SELECT trigger, response FROM auto_responder')
-            responses = {row[0]: row[1] for row in self.cursor.fetchall()}
-            print(f"Found {len(responses)} auto responses: {responses}")
-            self.update_cache('auto_responses', responses)
-            return responses
+            return self.cache.get_or_load('auto_responses', None, load)
         except Exception as e:
-            print(f"Error getting auto responses: {str(e)}")
-            return {}  # Return empty dict instead of cached data on error
+            logger.error("Error getting auto responses: %s", e)
+            raise
 
     def add_auto_response(self, trigger, response):
-        """Add auto response and update cache"""
+        """Add auto response and invalidate the cache"""
         try:
-            print(f"Adding auto response: trigger='{trigger}', response='{response}'")
-            self.ensure_connection()
-            self.execute_with_retry('''
+            self.execute('''
                 INSERT INTO auto_responder (trigger, response)
                 VALUES (?, ?)
                 ON CONFLICT (trigger) DO UPDATE SET response = ?
             ''', (trigger, response, response))
-            self.commit_with_retry()
             
-            # Force cache refresh
-            self.cache['auto_responses'] = {}
-            self.cache['cache_time']['auto_responses'] = datetime.now()
-            print("Auto response added successfully")
+            self.cache.invalidate('auto_responses')
+            logger.info("Auto response added", extra={'trigger': trigger})
             return True
         except Exception as e:
-            print(f"Error adding auto response: {str(e)}")
-            return False
+            logger.error("Error adding auto response: %s", e)
+            raise
 
     def remove_auto_response(self, trigger):
-        """Remove auto response and update cache"""
+        """Remove auto response and invalidate the cache"""
         try:
-            self.ensure_connection()
-            self.execute_with_retry('DELETE FROM auto_responder WHERE trigger = ?', (trigger,))
-            self.commit_with_retry()
+            self.execute('DELETE FROM auto_responder WHERE trigger = ?', (trigger,))
             
-            # Force cache refresh
-            self.cache['auto_responses'] = {}
-            self.cache['cache_time']['auto_responses'] = datetime.now()
+            self.cache.invalidate('auto_responses')
             return True
         except Exception as e:
-            print(f"Error removing auto response: {str(e)}")
-            return False
+            logger.error("Error removing auto response: %s", e)
+            raise
 
     # Daily cooldown methods
     def can_claim_daily(self, user_id):
         try:
-            self.cursor.execute('SELECT last_claim FROM daily_cooldown WHERE user_id = ?', (user_id,))
-            result = self.cursor.fetchone()
+            result = self.fetchone('SELECT last_claim FROM daily_cooldown WHERE user_id = ?', (user_id,))
             if not result:
                 return True
             last_claim = result[0]
             return datetime.now() - last_claim >= timedelta(hours=24)
         except Exception as e:
-            print(f"Error checking daily claim: {e}")
-            return True
+            logger.error("Error checking daily claim: %s", e)
+            raise
 
     def set_daily_claimed(self, user_id):
         try:
-            self.cursor.execute('''
+            self.execute('''
                 INSERT INTO daily_cooldown (user_id, last_claim)
                 VALUES (?, ?)
                 ON CONFLICT (user_id) DO UPDATE SET last_claim = ?
             ''', (user_id, datetime.now(), datetime.now()))
-            self.conn.commit()
         except Exception as e:
-            print(f"Error setting daily claimed: {e}")
-            self.conn.rollback()
+            logger.error("Error setting daily claimed: %s", e)
+            raise
+
+    # Bot state methods
+    def get_state(self, key):
+        try:
+            result = self.fetchone('SELECT value FROM bot_state WHERE key = ?', (key,))
+            return result[0] if result else None
+        except Exception as e:
+            logger.error("Error getting state %s: %s", key, e)
+            raise
+
+    def get_states(self, prefix):
+        """Every (key, value) pair whose key starts with prefix"""
+        try:
+            return self.fetchall(
+                'SELECT key, value FROM bot_state WHERE substr(key, 1, ?) = ? ORDER BY key',
+                (len(prefix), prefix)
+            )
+        except Exception as e:
+            logger.error("Error getting states %s: %s", prefix, e)
+            raise
+
+    def set_state(self, key, value):
+        try:
+            self.execute('''
+                INSERT INTO bot_state (key, value, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            ''', (key, value, datetime.now().isoformat()))
+        except Exception as e:
+            logger.error("Error setting state %s: %s", key, e)
+            raise
 
     # Jobs methods
     def get_jobs(self):
         """Get jobs with caching"""
-        if self.is_cache_valid('jobs'):
-            return self.cache['jobs']
-        
         try:
-            self.ensure_connection()
-            self.cursor.execute('SELECT role_id, salary FROM jobs')
-            jobs = {row[0]: row[1] for row in self.cursor.fetchall()}
-            self.update_cache('jobs', jobs)
-            return jobs
+            return self.cache.get_or_load(
+                'jobs', None,
+                lambda: {row[0]: row[1] for row in self.fetchall('SELECT role_id, salary FROM jobs')}
+            )
         except Exception as e:
-            print(f"Error getting jobs: {e}")
-            return self.cache['jobs']  # Return cached data if available
+            logger.error("Error getting jobs: %s", e)
+            raise
 
     def add_job(self, role_id, salary):
         try:
-            self.execute_with_retry('''
+            self.execute('''
                 INSERT INTO jobs (role_id, salary)
                 VALUES (?, ?)
                 ON CONFLICT (role_id) DO UPDATE SET salary = ?
             ''', (role_id, salary, salary))
-            self.commit_with_retry()
+            self.cache.invalidate('jobs')
         except Exception as e:
-            print(f"Error adding job: {e}")
+            logger.error("Error adding job: %s", e)
             raise
 
     def remove_job(self, role_id):
         try:
-            self.cursor.execute('DELETE FROM jobs WHERE role_id = ?', (role_id,))
-            self.conn.commit()
+            self.execute('DELETE FROM jobs WHERE role_id = ?', (role_id,))
+            self.cache.invalidate('jobs')
+        except Exception as e:
+            logger.error("Error removing job: %s", e)
+            raise
+
+    def payroll_paid(self, guild_id, period):
+        """Whether the guild has already been paid for the period"""
+        try:
+            return self.fetchone(
+                'SELECT 1 FROM payroll_runs WHERE guild_id = ? AND period = ?', (guild_id, period)
+            ) is not None
         except Exception as e:
-            print(f"Error removing job: {e}")
-            self.conn.rollback()
+            logger.error("Error checking payroll for guild %s: %s", guild_id, e)
+            raise
+
+    def run_payroll(self, guild_id, period, payouts):
+        """Credit {user_id: amount} once per guild and pay period.
+
+        The period is recorded in the same transaction as the payouts, so a
+        restart mid-period cannot pay twice. Returns the number of members paid,
+        or None if the period was already paid.
+        """
+        rows = [(user_id, amount) for user_id, amount in payouts.items() if amount]
+
+        def operation(cursor):
+            cursor.execute('''
+                INSERT INTO payroll_runs (guild_id, period, paid_at, members, total)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (guild_id, period) DO NOTHING
+            ''', (guild_id, period, datetime.now().isoformat(), len(rows), sum(amount for _, amount in rows)))
+            if cursor.rowcount == 0:
+                return None
+            cursor.executemany('''
+                INSERT INTO economy (user_id, balance)
+                VALUES (?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET balance = balance + excluded.balance
+            ''', rows)
+            return len(rows)
+        try:
+            return self.run_balance_transaction(operation)
+        finally:
+            self.cache.invalidate('balances', [user_id for user_id, _ in rows])
 
     def create_ticket(self, user_id, channel_id):
         try:
-            self.check_and_create_tables()
             now = datetime.now().isoformat()
-            self.execute_with_retry('''
+            ticket_id = self.execute('''
                 INSERT INTO tickets (user_id, channel_id, created_at, closed_at)
                 VALUES (?, ?, ?, NULL)
             ''', (user_id, channel_id, now))
-            self.commit_with_retry()
-            ticket_id = self.cursor.lastrowid
             return ticket_id
         except Exception as e:
-            print(f"Error creating ticket: {str(e)}")
+            logger.error("Error creating ticket: %s", e)
             raise
 
     def close_ticket(self, channel_id):
         try:
-            self.check_and_create_tables()
             now = datetime.now().isoformat()
-            self.cursor.execute('''
+            self.execute('''
                 UPDATE tickets SET closed_at = ? WHERE channel_id = ?
             ''', (now, channel_id))
-            self.conn.commit()
         except Exception as e:
-            print(f"Error closing ticket: {str(e)}")
-            self.conn.rollback()
+            logger.error("Error closing ticket: %s", e)
+            raise
+
+    def claim_ticket(self, channel_id, user_id):
+        try:
+            self.execute('''
+                UPDATE tickets SET claimed_by = ? WHERE channel_id = ? AND closed_at IS NULL
+            ''', (user_id, channel_id))
+        except Exception as e:
+            logger.error("Error claiming ticket: %s", e)
+            raise
+
+    def get_open_tickets(self):
+        """All open tickets, used to warm the in-memory ticket index"""
+        try:
+            rows = self.fetchall('''
+                SELECT id, user_id, channel_id, claimed_by FROM tickets WHERE closed_at IS NULL
+            ''')
+            return [
+                {"id": row[0], "user_id": row[1], "channel_id": row[2], "claimed_by": row[3]}
+                for row in rows
+            ]
+        except Exception as e:
+            logger.error("Error getting open tickets: %s", e)
+            raise
 
     def log_ticket_action(self, ticket_id, action, details=None):
+        """Buffer a ticket log row; it is inserted with the next batch"""
+        now = datetime.now().isoformat()
+        if self.ticket_log_buffer.put((ticket_id, action, now, details)):
+            self.flush_ticket_logs()
+
+    def flush_ticket_logs(self):
+        """Insert every buffered ticket log row in one transaction and return the row count"""
+        with self._ticket_log_lock:
+            rows = self.ticket_log_buffer.drain()
+            if not rows:
+                return 0
+            try:
+                def operation(cursor):
+                    cursor.executemany('''
+                        INSERT INTO ticket_logs (ticket_id, action, timestamp, details)
+                        VALUES (?, ?, ?, ?)
+                    ''', rows)
+                self.run_in_transaction(operation)
+            except Exception as e:
+                self.ticket_log_buffer.restore(rows)
+                logger.error("Error flushing %s ticket log(s): %s", len(rows), e)
+                raise
+            return len(rows)
+
+    def get_ticket_logs_page(self, ticket_id, after=None, limit=500):
+        """One page of a ticket's log rows in time order.
+
+        ``after`` is the (timestamp, id) of the last row of the previous page;
+        keyset paging walks the (ticket_id, timestamp) index without OFFSET scans.
+        """
         try:
-            self.check_and_create_tables()
-            now = datetime.now().isoformat()
-            self.cursor.execute('''
-                INSERT INTO ticket_logs (ticket_id, action, timestamp, details)
-                VALUES (?, ?, ?, ?)
-            ''', (ticket_id, action, now, details))
-            self.conn.commit()
+            if after is None:
+                return self.fetchall('''
+                    SELECT id, action, timestamp, details FROM ticket_logs
+                    WHERE ticket_id = ?
+                    ORDER BY timestamp, id LIMIT ?
+                ''', (ticket_id, limit))
+            timestamp, row_id = after
+            return self.fetchall('''
+                SELECT id, action, timestamp, details FROM ticket_logs
+                WHERE ticket_id = ? AND (timestamp > ? OR (timestamp = ? AND id > ?))
+                ORDER BY timestamp, id LIMIT ?
+            ''', (ticket_id, timestamp, timestamp, row_id, limit))
         except Exception as e:
-            print(f"Error logging ticket action: {str(e)}")
-            self.conn.rollback()
+            logger.error("Error getting ticket logs: %s", e)
+            raise
 
-    def get_ticket_by_channel(self, channel_id):
+    # Scheduled action methods
+    def add_scheduled_action(self, kind, guild_id, user_id, run_at, payload=None):
+        """Persist an action to run at the Unix timestamp run_at and return its ID"""
+        try:
+            return self.execute('''
+                INSERT INTO scheduled_actions (kind, guild_id, user_id, run_at, payload, attempts, created_at)
+                VALUES (?, ?, ?, ?, ?, 0, ?)
+            ''', (kind, guild_id, user_id, run_at, payload, datetime.now().isoformat()))
+        except Exception as e:
+            logger.error("Error scheduling %s: %s", kind, e)
+            raise
+
+    def get_scheduled_actions_page(self, after_id=0, limit=5000):
+        """Pending actions with IDs above after_id, in ID order, for loading at startup"""
         try:
-            self.check_and_create_tables()
-            self.cursor.execute('SELECT id, user_id, created_at, closed_at FROM tickets WHERE channel_id = ?', (channel_id,))
-            return self.cursor.fetchone()
+            return self.fetchall('''
+                SELECT id, kind, guild_id, user_id, run_at, payload, attempts FROM scheduled_actions
+                WHERE id > ?
+                ORDER BY id LIMIT ?
+            ''', (after_id, limit))
         except Exception as e:
-            print(f"Error getting ticket by channel: {str(e)}")
-            return None
+            logger.error("Error getting scheduled actions: %s", e)
+            raise
 
-    def is_cache_valid(self, cache_key):
-        """Check if the cache is still valid"""
-        if cache_key not in self.cache['cache_time']:
-            return False
-        return (datetime.now() - self.cache['cache_time'][cache_key]).total_seconds() < self.cache_duration
+    def get_scheduled_actions(self, kind, guild_id, user_id):
+        """Pending actions of a kind for one member"""
+        try:
+            return self.fetchall('''
+                SELECT id, kind, guild_id, user_id, run_at, payload, attempts FROM scheduled_actions
+                WHERE kind = ? AND guild_id = ? AND user_id = ?
+            ''', (kind, guild_id, user_id))
+        except Exception as e:
+            logger.error("Error getting %s for user %s: %s", kind, user_id, e)
+            raise
 
-    def update_cache(self, cache_key, data):
-        """Update the cache with new data"""
-        self.cache[cache_key] = data
-        self.cache['cache_time'][cache_key] = datetime.now()
+    def delete_scheduled_actions(self, action_ids):
+        """Remove finished actions in one transaction"""
+        def operation(cursor):
+            cursor.executemany('DELETE FROM scheduled_actions WHERE id = ?', [(action_id,) for action_id in action_ids])
+        try:
+            if action_ids:
+                self.run_in_transaction(operation)
+        except Exception as e:
+            logger.error("Error deleting %s scheduled action(s): %s", len(action_ids), e)
+            raise
+
+    def reschedule_actions(self, updates):
+        """Move actions to a new time; updates are (run_at, attempts, id) tuples"""
+        def operation(cursor):
+            cursor.executemany('UPDATE scheduled_actions SET run_at = ?, attempts = ? WHERE id = ?', updates)
+        try:
+            if updates:
+                self.run_in_transaction(operation)
+        except Exception as e:
+            logger.error("Error rescheduling %s action(s): %s", len(updates), e)
+            raise
+
+    def cancel_scheduled_actions(self, kind, guild_id, user_id):
+        """Delete the pending actions of a kind for one member and return their IDs"""
+        def operation(cursor):
+            cursor.execute(
+                'SELECT id FROM scheduled_actions WHERE kind = ? AND guild_id = ? AND user_id = ?',
+                (kind, guild_id, user_id)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.executemany('DELETE FROM scheduled_actions WHERE id = ?', [(action_id,) for action_id in ids])
+            return ids
+        try:
+            return self.run_in_transaction(operation)
+        except Exception as e:
+            logger.error("Error cancelling %s for user %s: %s", kind, user_id, e)
+            raise
+
+    # Fines methods
+    def add_fine(self, guild_id, user_id, amount, issued_by, deadline):
+        """Record an unpaid fine due at the Unix timestamp deadline and return its ID"""
+        try:
+            return self.execute('''
+                INSERT INTO fines (guild_id, user_id, amount, issued_by, issued_at, deadline, status)
+                VALUES (?, ?, ?, ?, ?, ?, 'unpaid')
+            ''', (guild_id, user_id, amount, issued_by, datetime.now().isoformat(), deadline))
+        except Exception as e:
+            logger.error("Error recording fine for user %s: %s", user_id, e)
+            raise
+
+    def get_fines(self, guild_id, user_id, limit=10):
+        """A member's most recent fines as (id, amount, issued_by, deadline, status, deducted) rows"""
+        try:
+            return self.fetchall('''
+                SELECT id, amount, issued_by, deadline, status, deducted FROM fines
+                WHERE guild_id = ? AND user_id = ?
+                ORDER BY id DESC LIMIT ?
+            ''', (guild_id, user_id, limit))
+        except Exception as e:
+            logger.error("Error getting fines for user %s: %s", user_id, e)
+            raise
+
+    def mark_fines_paid(self, guild_id, user_id):
+        """Settle every unpaid fine of a member and return their IDs"""
+        def operation(cursor):
+            cursor.execute(
+                "SELECT id FROM fines WHERE guild_id = ? AND user_id = ? AND status = 'unpaid'",
+                (guild_id, user_id)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            settled_at = datetime.now().isoformat()
+            paid = []
+            for fine_id in ids:
+                cursor.execute(
+                    "UPDATE fines SET status = 'paid', settled_at = ? WHERE id = ? AND status = 'unpaid'",
+                    (settled_at, fine_id)
+                )
+                if cursor.rowcount:
+                    paid.append(fine_id)
+            return paid
+        try:
+            return self.run_in_transaction(operation, begin='BEGIN IMMEDIATE')
+        except Exception as e:
+            logger.error("Error settling fines for user %s: %s", user_id, e)
+            raise
+
+    def enforce_overdue_fines(self, now, limit=1000, shards=None):
+        """Confiscate the whole balance of members with fines unpaid past their deadline.
+
+        Up to limit overdue fines are found with one query on the (status,
+        deadline) index; the balances are zeroed and the fines marked enforced
+        in a single transaction that holds the write lock from its first read,
+        so a fine settled or a deposit made meanwhile is never overwritten.
+        A member with several overdue fines loses their balance once, recorded
+        on the oldest fine; balances at or below zero are left as they are.
+        shards is an optional (shard_count, shard_ids) pair restricting
+        enforcement to guilds on those shards. Returns (fine_id, guild_id,
+        user_id, amount, deducted) tuples.
+        """
+        user_ids = []
+        shard_filter, shard_params = '', []
+        if shards is not None:
+            shard_count, shard_ids = shards
+            shard_filter = f"AND (guild_id >> 22) % ? IN ({', '.join('?' * len(shard_ids))})"
+            shard_params = [shard_count, *shard_ids]
+
+        def operation(cursor):
+            cursor.execute(f'''
+                SELECT id, guild_id, user_id, amount FROM fines
+                WHERE status = 'unpaid' AND deadline <= ? {shard_filter}
+                ORDER BY deadline LIMIT ?
+            ''', (now, *shard_params, limit))
+            overdue = cursor.fetchall()
+            user_ids.extend(sorted({row[2] for row in overdue}))
+            balances = {}
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(user_ids), 500):
+                chunk = user_ids[start:start + 500]
+                cursor.execute(
+                    f"SELECT user_id, balance FROM economy WHERE user_id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                )
+                balances.update(cursor.fetchall())
+
+            settled_at = datetime.now().isoformat()
+            enforced = []
+            confiscated = set()
+            for fine_id, guild_id, user_id, amount in overdue:
+                deducted = 0 if user_id in confiscated else max(balances.get(user_id, 0), 0)
+                cursor.execute('''
+                    UPDATE fines SET status = 'enforced', settled_at = ?, deducted = ?
+                    WHERE id = ? AND status = 'unpaid'
+                ''', (settled_at, deducted, fine_id))
+                if cursor.rowcount:
+                    confiscated.add(user_id)
+                    enforced.append((fine_id, guild_id, user_id, amount, deducted))
+            cursor.executemany(
+                'UPDATE economy SET balance = 0 WHERE user_id = ? AND balance > 0',
+                [(user_id,) for user_id in sorted(confiscated)]
+            )
+            return enforced
+        try:
+            return self.run_balance_transaction(operation, begin='BEGIN IMMEDIATE')
+        except Exception as e:
+            logger.error("Error enforcing overdue fines: %s", e)
+            raise
+        finally:
+            if user_ids:
+                self.cache.invalidate('balances', user_ids)
+
+    def get_ticket_by_channel(self, channel_id):
+        try:
+            return self.fetchone('SELECT id, user_id, created_at, closed_at FROM tickets WHERE channel_id = ?', (channel_id,))
+        except Exception as e:
+            logger.error("Error getting ticket by channel: %s", e)
+            raise
 
     def close(self):
-        """Close the database connection"""
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close() 
\ No newline at end of file
+        """Flush buffered writes and close every pooled database connection"""
+        try:
+            self.flush_balances()
+            self.flush_ticket_logs()
+        finally:
+            self.pool.close() 
+
+
+class AsyncDatabase:
+    """Awaitable facade over Database.
+
+    Every method of the wrapped Database is exposed as a coroutine that runs on
+    a bounded thread pool, so database round trips never block the event loop.
+    Failed calls are retried with jittered exponential backoff, and a shared
+    circuit breaker fails fast while the database is unhealthy.
+    """
+
+    # Reads that can be answered from a stale cache entry while the database is down
+    CACHED_READS = {
+        'get_mod_roles': 'mod_roles',
+        'get_jobs': 'jobs',
+        'get_auto_responses': 'auto_responses',
+    }
+
+    # Errors that mean the database answered; they are never retried
+    NON_RETRYABLE = (InsufficientFundsError, ValueError)
+
+    # Writes that move money by a delta or insert a new row. An error after the
+    # COMMIT reached the server would apply them twice on retry, so they are
+    # only retried when no connection could be opened.
+    NON_IDEMPOTENT = {'add_balance', 'transfer', 'apply_deltas', 'add_fine', 'create_ticket',
+                      'add_scheduled_action'}
+
+    def __init__(self, database=None, retry_policy=None, breaker=None):
+        self.db = database if database is not None else Database()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        # One worker per pooled connection, so concurrent commands never wait on each other's queries
+        self.executor = ThreadPoolExecutor(max_workers=self.db.pool.size, thread_name_prefix='db')
+        self._flush_task = None
+
+    async def setup(self):
+        """Migrate the schema and start background flushing; call once the event loop is running"""
+        await self.migrate()
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.db.balance_buffer.flush_interval)
+            # Writes stay buffered after a failure and are retried on the next tick
+            if len(self.db.balance_buffer):
+                try:
+                    await self.flush_balances()
+                except Exception as e:
+                    logger.error("Background balance flush failed: %s", e)
+            if len(self.db.ticket_log_buffer):
+                try:
+                    await self.flush_ticket_logs()
+                except Exception as e:
+                    logger.error("Background ticket log flush failed: %s", e)
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking callable on the database executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def call(self, name, *args, **kwargs):
+        """Call a Database method through the retry policy and circuit breaker"""
+        func = getattr(self.db, name)
+
+        async def attempt():
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = await self.run(func, *args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                DB_QUERY_SECONDS.observe(time.perf_counter() - started, name, outcome)
+
+        try:
+            return await self.retry_policy.run(
+                attempt,
+                breaker=self.breaker,
+                description=name,
+                give_up_on=self.NON_RETRYABLE,
+                retry_on=ConnectionOpenError if name in self.NON_IDEMPOTENT else Exception
+            )
+        except Exception:
+            namespace = self.CACHED_READS.get(name)
+            if namespace is not None:
+                found, value = self.db.cache.get(namespace, allow_stale=True)
+                if found:
+                    logger.warning("Serving %s from cache while the database is unavailable", name)
+                    return value
+            raise
+
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+        if not callable(attr):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await self.call(name, *args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    def status(self):
+        """Snapshot of database health for operators"""
+        return {
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'trips': self.breaker.total_trips,
+            'retry_after': self.breaker.retry_after(),
+            'pool_size': self.db.pool.size,
+            'pending_balance_writes': len(self.db.balance_buffer),
+            'cache': self.db.cache.stats(),
+        }
+
+    async def close(self):
+        """Flush buffered writes, close the database connections and stop the executor"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        try:
+            await self.flush_balances()
+            await self.flush_ticket_logs()
+        except Exception as e:
+            logger.error("Final flush failed: %s", e)
+        await self.run(self.db.close)
+        self.executor.shutdown(wait=True)
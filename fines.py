@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+
+import discord
+from discord.ext import tasks
+
+from sharding import owned_shards
+
+logger = logging.getLogger(__name__)
+
+
+class FineEnforcer:
+    """Applies the penalty for fines left unpaid past their deadline.
+
+    Each run confiscates the bank balance of every member with an overdue fine
+    in batched transactions, then tells them by DM. Runs are triggered by the
+    scheduler at each fine's deadline, with a periodic check as a fallback;
+    cluster workers only enforce fines issued in guilds on their own shards.
+    """
+
+    def __init__(self, bot, db, interval=None, batch_size=None):
+        self.bot = bot
+        self.db = db
+        self.batch_size = batch_size or int(os.getenv('FINES_BATCH_SIZE', '1000'))
+        interval = interval or float(os.getenv('FINES_CHECK_INTERVAL', '15'))  # minutes
+        self.loop = tasks.loop(minutes=interval)(self._tick)
+        self.loop.before_loop(self.bot.wait_until_ready)
+        self.shards = owned_shards()
+        self._pending = None
+
+    def start(self):
+        if not self.loop.is_running():
+            self.loop.start()
+
+    def stop(self):
+        self.loop.cancel()
+
+    async def _tick(self):
+        try:
+            # Shares a run already started by the scheduler, so members are never told twice
+            await self.request()
+        except Exception as e:
+            logger.error("Fine enforcement failed: %s", e)
+
+    def request(self):
+        """Run enforcement soon; callers arriving while a run is pending share it"""
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self.run())
+        return self._pending
+
+    async def run(self, now=None):
+        """Enforce every fine overdue at now and return the enforced fines"""
+        now = now or time.time()
+        enforced = []
+        while True:
+            batch = await self.db.enforce_overdue_fines(now, self.batch_size, self.shards)
+            enforced.extend(batch)
+            if len(batch) < self.batch_size:
+                break
+        if enforced:
+            logger.info("Enforced %s overdue fine(s) against %s member(s)",
+                        len(enforced), len({fine[2] for fine in enforced}))
+            await self.notify(enforced)
+        return enforced
+
+    async def notify(self, enforced):
+        deducted = defaultdict(int)
+        for _, _, user_id, _, amount in enforced:
+            deducted[user_id] += amount
+        for user_id, amount in deducted.items():
+            try:
+                user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+                await user.send(f"انتهت مهلة سداد المخالفة وتم خصم {amount} من نقودك في البنك")
+            except discord.HTTPException:
+                # DMs closed or the account is gone; the deduction stands
+                pass
@@ -0,0 +1,130 @@
+import os
+import time
+from collections import Counter
+
+import discord
+
+# Intents the commands actually use: members for role members and join
+# windows, moderation for the ban index, guild messages and their content for
+# prefix commands, the auto responder and purges.
+MINIMAL_INTENTS = ('guilds', 'members', 'moderation', 'guild_messages', 'message_content')
+
+INTENT_PROFILES = {
+    'minimal': lambda: discord.Intents(**{name: True for name in MINIMAL_INTENTS}),
+    'default': discord.Intents.default,
+    'full': discord.Intents.all,
+}
+
+# High-volume gateway events and the intent that subscribes to them. Guild
+# flags rather than aliases such as 'messages', which are only true when the
+# guild and DM flags are both set.
+EVENT_INTENTS = {
+    'PRESENCE_UPDATE': 'presences',
+    'TYPING_START': 'guild_typing',
+    'MESSAGE_REACTION_ADD': 'guild_reactions',
+    'MESSAGE_REACTION_REMOVE': 'guild_reactions',
+    'VOICE_STATE_UPDATE': 'voice_states',
+    'GUILD_MEMBER_UPDATE': 'members',
+    'MESSAGE_CREATE': 'guild_messages',
+    'MESSAGE_UPDATE': 'guild_messages',
+}
+
+
+def build_intents(spec=None):
+    """Intents from DISCORD_INTENTS: a profile name, optionally followed by +flag/-flag edits.
+
+    For example ``minimal``, ``full`` or ``minimal,+presences,-message_content``.
+    """
+    spec = spec or os.getenv('DISCORD_INTENTS', 'minimal')
+    parts = [part.strip() for part in spec.split(',') if part.strip()]
+    profile = parts[0] if parts and parts[0][0] not in '+-' else 'minimal'
+    if profile not in INTENT_PROFILES:
+        raise ValueError(f"Unknown DISCORD_INTENTS profile '{profile}', expected one of: {', '.join(INTENT_PROFILES)}")
+    intents = INTENT_PROFILES[profile]()
+    for part in parts:
+        if part[0] in '+-':
+            name = part[1:]
+            if name not in discord.Intents.VALID_FLAGS:
+                raise ValueError(f"Unknown intent '{name}' in DISCORD_INTENTS")
+            setattr(intents, name, part[0] == '+')
+    return intents
+
+
+def build_member_cache_flags(intents, spec=None):
+    """Member cache policy from DISCORD_MEMBER_CACHE: 'auto', 'joined' or 'none'"""
+    spec = (spec or os.getenv('DISCORD_MEMBER_CACHE', 'auto')).lower()
+    if spec == 'auto':
+        return discord.MemberCacheFlags.from_intents(intents)
+    if spec == 'joined':
+        return discord.MemberCacheFlags(voice=False, joined=intents.members)
+    if spec == 'none':
+        return discord.MemberCacheFlags.none()
+    raise ValueError(f"Unknown DISCORD_MEMBER_CACHE '{spec}', expected 'auto', 'joined' or 'none'")
+
+
+def chunk_guilds_at_startup():
+    """Whether to download every guild's member list on connect (DISCORD_CHUNK_GUILDS)"""
+    # Off by default: guilds are chunked on demand by the commands that need the full list
+    return os.getenv('DISCORD_CHUNK_GUILDS', 'false').lower() in ('1', 'true', 'yes')
+
+
+async def ensure_chunked(guild):
+    """Fetch the guild's full member list if it has not been downloaded yet"""
+    if guild.chunked:
+        return
+    try:
+        await guild.chunk(cache=True)
+    except discord.ClientException:
+        # The members intent is disabled, so only the partial cache is available
+        pass
+
+
+def rss_bytes():
+    """Current resident set size of this process, or None if unavailable"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS, in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+class GatewayStats:
+    """Counts gateway events by type to compare intent profiles"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.events = Counter()
+        self.started = time.monotonic()
+
+    def record(self, event_type):
+        self.events[event_type] += 1
+
+    def report(self, bot):
+        elapsed_minutes = max((time.monotonic() - self.started) / 60, 1 / 60)
+        total = sum(self.events.values())
+        minimal = INTENT_PROFILES['minimal']()
+        # Events this process receives that the minimal profile would not subscribe to
+        avoidable = sum(
+            count for event, count in self.events.items()
+            if event in EVENT_INTENTS and not getattr(minimal, EVENT_INTENTS[event])
+        )
+        return {
+            'profile': self.profile,
+            'intents': sorted(name for name, enabled in bot.intents if enabled),
+            'guilds': len(bot.guilds),
+            'cached_members': sum(len(guild.members) for guild in bot.guilds),
+            'cached_users': len(bot.users),
+            'rss_bytes': rss_bytes(),
+            'events_per_minute': total / elapsed_minutes,
+            'avoidable_events_per_minute': avoidable / elapsed_minutes,
+            'top_events': [(event, count / elapsed_minutes) for event, count in self.events.most_common(5)],
+        }
@@ -0,0 +1,166 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+# LogRecord attributes; anything else on a record came from extra= and is a structured field
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sample'}
+
+_samples = {}
+
+
+def sample(every):
+    """extra= for a high-frequency debug call: only 1 in `every` records per call site is kept.
+
+    The dict is shared per rate, so passing it costs nothing on the hot path.
+    """
+    if every not in _samples:
+        _samples[every] = {'sample': every}
+    return _samples[every]
+
+
+def fields(record):
+    """Structured fields attached to a record through extra="""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS and not key.startswith('_')}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with structured fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-8s %(name)s: %(message)s')
+
+    def formatMessage(self, record):
+        text = super().formatMessage(record)
+        extra = fields(record)
+        if extra:
+            text += ' ' + ' '.join(f'{key}={value}' for key, value in extra.items())
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """Drops all but 1 in N records logged with extra=sample(N), counted per call site"""
+
+    def __init__(self, enabled=True):
+        super().__init__()
+        self.enabled = enabled
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        every = getattr(record, 'sample', None)
+        if not self.enabled or every is None or every <= 1:
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts[site]
+            self._counts[site] = count + 1
+        return count % every == 0
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller; records are dropped when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the message arguments and render tracebacks now, while they
+        # are still valid, but leave formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_queue_handler = None
+
+
+def parse_levels(spec):
+    """{'database': 'DEBUG', ...} from a LOG_LEVELS string like 'database=DEBUG,discord=WARNING'"""
+    levels = {}
+    for part in (spec or '').split(','):
+        name, _, level = part.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Route every logger through a bounded queue to a background writer thread.
+
+    LOG_LEVEL sets the root level, LOG_LEVELS overrides it per logger,
+    LOG_FORMAT picks 'text' or 'json', LOG_QUEUE_SIZE bounds the queue and
+    LOG_SAMPLING=false keeps every sampled debug record.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if os.getenv('LOG_FORMAT', 'text').lower() == 'json' else TextFormatter()
+    stream = logging.StreamHandler()
+    stream.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(os.getenv('LOG_SAMPLING', 'true').lower() not in ('0', 'false', 'no')))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    for name, level in parse_levels(os.getenv('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records():
+    """Records dropped because the log queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -0,0 +1,247 @@
+import bisect
+import logging
+import math
+import os
+import threading
+import time
+
+from aiohttp import web
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans cached reads (sub-millisecond) to slow remote queries and commands
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if value != value:
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns {labels: value}"""
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        if self.callback is None:
+            return lines
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.warning("Metric %s callback failed: %s", self.name, e)
+            return lines
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    'modbot_db_query_seconds', 'Duration of each database call attempt', ('method', 'outcome')))
+DB_RETRIES = REGISTRY.register(Counter(
+    'modbot_db_retries_total', 'Database calls retried after an error', ('method',)))
+DB_CONNECTIONS_OPENED = REGISTRY.register(Counter(
+    'modbot_db_connections_opened_total', 'Database connections opened by the pool'))
+DB_CONNECTIONS_EVICTED = REGISTRY.register(Counter(
+    'modbot_db_connections_evicted_total', 'Dead database connections dropped from the pool'))
+COMMAND_SECONDS = REGISTRY.register(Histogram(
+    'modbot_command_seconds', 'Duration of slash and prefix commands', ('command', 'kind', 'outcome')))
+LOOP_STALLS = REGISTRY.register(Counter(
+    'modbot_loop_stalls_total', 'Event loop stalls longer than the watchdog threshold'))
+LOOP_STALL_SECONDS = REGISTRY.register(Histogram(
+    'modbot_loop_stall_seconds', 'Duration of event loop stalls', buckets=(0.25, 0.5, 1, 2.5, 5, 10, 30, 60)))
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """CommandTree that records how long every slash command takes"""
+
+    async def interaction_check(self, interaction):
+        interaction.extras['metrics_started'] = time.perf_counter()
+        return True
+
+    def _observe(self, interaction, outcome):
+        started = interaction.extras.get('metrics_started')
+        if started is not None and interaction.command is not None:
+            COMMAND_SECONDS.observe(time.perf_counter() - started, interaction.command.qualified_name, 'slash', outcome)
+
+    async def on_error(self, interaction, error):
+        self._observe(interaction, 'error')
+        await super().on_error(interaction, error)
+
+
+def instrument(bot, db):
+    """Register command timing hooks and gauges for the bot and its database"""
+
+    async def on_app_command_completion(interaction, command):
+        bot.tree._observe(interaction, 'ok')
+
+    async def before_invoke(ctx):
+        ctx.metrics_started = time.perf_counter()
+
+    async def on_command_completion(ctx):
+        _observe_prefix(ctx, 'ok')
+
+    async def on_command_error(ctx, error):
+        _observe_prefix(ctx, 'error')
+
+    def _observe_prefix(ctx, outcome):
+        started = getattr(ctx, 'metrics_started', None)
+        if started is not None and ctx.command is not None:
+            COMMAND_SECONDS.observe(time.perf_counter() - started, ctx.command.qualified_name, 'prefix', outcome)
+
+    if isinstance(bot.tree, InstrumentedCommandTree):
+        bot.add_listener(on_app_command_completion)
+    bot.before_invoke(before_invoke)
+    bot.add_listener(on_command_completion)
+    bot.add_listener(on_command_error)
+
+    def gateway_latency():
+        latencies = getattr(bot, 'latencies', None) or [(0, bot.latency)]
+        return {(str(shard_id),): latency for shard_id, latency in latencies}
+
+    def cache_ratio():
+        ratios = {}
+        for name, stats in db.db.cache.stats().items():
+            lookups = stats['hits'] + stats['misses']
+            ratios[(name,)] = stats['hits'] / lookups if lookups else 0
+        return ratios
+
+    def circuit_open():
+        return {(): 0 if db.breaker.state == 'closed' else 1}
+
+    REGISTRY.register(Gauge('modbot_gateway_latency_seconds', 'Heartbeat latency per shard', ('shard',), gateway_latency))
+    REGISTRY.register(Gauge('modbot_guilds', 'Guilds this process serves', (), lambda: {(): len(bot.guilds)}))
+    REGISTRY.register(Gauge('modbot_cache_hit_ratio', 'Cache hits over lookups per namespace', ('namespace',), cache_ratio))
+    REGISTRY.register(Gauge('modbot_db_circuit_open', '1 while the database circuit breaker is not closed', (), circuit_open))
+    REGISTRY.register(Gauge(
+        'modbot_db_circuit_trips', 'Times the database circuit breaker has opened', (),
+        lambda: {(): db.breaker.total_trips}))
+    REGISTRY.register(Gauge(
+        'modbot_pending_balance_writes', 'Balance writes waiting for the next flush', (),
+        lambda: {(): len(db.db.balance_buffer)}))
+
+
+class MetricsServer:
+    """Serves REGISTRY at /metrics from the bot's own event loop"""
+
+    def __init__(self, host=None, port=None):
+        self.host = host or os.getenv('METRICS_HOST', '127.0.0.1')
+        self.port = port if port is not None else int(os.getenv('METRICS_PORT', '9100'))
+        self._runner = None
+
+    async def handle(self, request):
+        return web.Response(text=REGISTRY.expose(), content_type='text/plain', charset='utf-8')
+
+    async def start(self, offset=0):
+        """Start listening; offset is added to the port so cluster workers don't collide"""
+        if not self.port:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port + offset)
+        await site.start()
+        logger.info("Serving metrics on http://%s:%s/metrics", self.host, self.port + offset)
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,130 @@
+# Ordered schema migrations: (version, description, statements).
+# Append new migrations with the next version number; never edit an applied one.
+MIGRATIONS = [
+    (1, "Initial schema", [
+        # IF NOT EXISTS keeps this safe on databases created before migrations existed
+        '''
+        CREATE TABLE IF NOT EXISTS economy (
+            user_id INTEGER PRIMARY KEY,
+            balance INTEGER DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS mod_roles (
+            role_id INTEGER PRIMARY KEY
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS ticket_panel (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            description TEXT,
+            color TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS auto_responder (
+            trigger TEXT PRIMARY KEY,
+            response TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS daily_cooldown (
+            user_id INTEGER PRIMARY KEY,
+            last_claim TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS jobs (
+            role_id INTEGER PRIMARY KEY,
+            salary INTEGER
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            channel_id INTEGER,
+            created_at TEXT,
+            closed_at TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS ticket_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id INTEGER,
+            action TEXT,
+            timestamp TEXT,
+            details TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS payroll_runs (
+            guild_id INTEGER,
+            period TEXT,
+            paid_at TEXT,
+            members INTEGER,
+            total INTEGER,
+            PRIMARY KEY (guild_id, period)
+        )
+        ''',
+    ]),
+    (2, "Indexes for ticket lookups", [
+        # get_ticket_by_channel and close_ticket filter on channel_id
+        'CREATE INDEX IF NOT EXISTS idx_tickets_channel_id ON tickets (channel_id)',
+        # Ticket logs are read per ticket in time order
+        'CREATE INDEX IF NOT EXISTS idx_ticket_logs_ticket_time ON ticket_logs (ticket_id, timestamp)',
+    ]),
+    (3, "Ticket claims and open-ticket index", [
+        'ALTER TABLE tickets ADD COLUMN claimed_by INTEGER',
+        # The ticket index is warmed from the open tickets at startup
+        'CREATE INDEX IF NOT EXISTS idx_tickets_closed_at ON tickets (closed_at)',
+    ]),
+    (4, "Key/value bot state", [
+        # Small values that must survive restarts, such as the last synced command hash
+        '''
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at TEXT
+        )
+        ''',
+    ]),
+    (5, "Scheduled actions", [
+        # Temp-ban expiries, long timeouts and fine deadlines; run_at is a Unix timestamp
+        '''
+        CREATE TABLE IF NOT EXISTS scheduled_actions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            guild_id INTEGER,
+            user_id INTEGER,
+            run_at REAL NOT NULL,
+            payload TEXT,
+            attempts INTEGER DEFAULT 0,
+            created_at TEXT
+        )
+        ''',
+        # Cancelling looks actions up by target, e.g. every pending unban of a user
+        'CREATE INDEX IF NOT EXISTS idx_scheduled_actions_target ON scheduled_actions (kind, guild_id, user_id)',
+    ]),
+    (6, "Fines ledger", [
+        # Fines issued with رصد; status is 'unpaid', 'paid' or 'enforced', deadline a Unix timestamp
+        '''
+        CREATE TABLE IF NOT EXISTS fines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            issued_by INTEGER,
+            issued_at TEXT,
+            deadline REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'unpaid',
+            settled_at TEXT,
+            deducted INTEGER
+        )
+        ''',
+        # Enforcement finds overdue fines with a range scan on this index
+        'CREATE INDEX IF NOT EXISTS idx_fines_status_deadline ON fines (status, deadline)',
+        'CREATE INDEX IF NOT EXISTS idx_fines_member ON fines (guild_id, user_id, status)',
+    ]),
+]
@@ -0,0 +1,111 @@
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from discord.ext import tasks
+
+from gateway import ensure_chunked
+
+logger = logging.getLogger(__name__)
+
+
+def pay_period(now=None, period=None):
+    """Key identifying the pay period that contains ``now``"""
+    now = now or datetime.now(timezone.utc)
+    period = period or os.getenv('PAYROLL_PERIOD', 'weekly')
+    if period == 'daily':
+        return now.strftime('%Y-%m-%d')
+    if period == 'weekly':
+        year, week, _ = now.isocalendar()
+        return f"{year}-W{week:02d}"
+    raise ValueError(f"Unknown PAYROLL_PERIOD '{period}', expected 'daily' or 'weekly'")
+
+
+def compute_payouts(guild, jobs):
+    """Total salary per member from the guild's cached role members.
+
+    A member holding several job roles is paid for each of them; bots are skipped.
+    """
+    payouts = defaultdict(int)
+    for role_id, salary in jobs.items():
+        role = guild.get_role(role_id)
+        if role is None or not salary:
+            continue
+        for member in role.members:
+            if not member.bot:
+                payouts[member.id] += salary
+    return dict(payouts)
+
+
+@dataclass
+class PayrollResult:
+    guild_id: int
+    period: str
+    members: int
+    total: int
+    elapsed: float  # seconds
+    already_paid: bool = False
+
+
+class Payroll:
+    """Pays job salaries once per pay period with one batched write per guild"""
+
+    def __init__(self, bot, db, interval=None):
+        self.bot = bot
+        self.db = db
+        # How often to check whether a new pay period has started
+        interval = interval or float(os.getenv('PAYROLL_CHECK_INTERVAL', '60'))  # minutes
+        self.loop = tasks.loop(minutes=interval)(self._tick)
+        self.loop.before_loop(self._before_tick)
+
+    def start(self):
+        if not self.loop.is_running():
+            self.loop.start()
+
+    def stop(self):
+        self.loop.cancel()
+
+    async def _before_tick(self):
+        # Role members come from the member cache, which fills in after ready
+        await self.bot.wait_until_ready()
+
+    async def _tick(self):
+        for guild in self.bot.guilds:
+            try:
+                result = await self.run(guild)
+            except Exception as e:
+                logger.error("Payroll failed for guild %s: %s", guild.id, e)
+                continue
+            if result.members:
+                logger.info("Paid %s to %s member(s) in guild %s for %s in %.1fms",
+                            result.total, result.members, guild.id, result.period, result.elapsed * 1000)
+
+    async def run(self, guild, period=None):
+        """Pay every job holder in ``guild`` for the period, unless it was already paid"""
+        start = time.perf_counter()
+        period = period or pay_period()
+        jobs = await self.db.get_jobs()
+        # Checked before chunking, so hourly ticks never download member lists for nothing
+        if not jobs or await self.db.payroll_paid(guild.id, period):
+            return PayrollResult(
+                guild_id=guild.id,
+                period=period,
+                members=0,
+                total=0,
+                elapsed=time.perf_counter() - start,
+                already_paid=bool(jobs)
+            )
+        await ensure_chunked(guild)
+        payouts = compute_payouts(guild, jobs)
+        paid = await self.db.run_payroll(guild.id, period, payouts)
+        return PayrollResult(
+            guild_id=guild.id,
+            period=period,
+            members=len(payouts),
+            total=sum(payouts.values()),
+            elapsed=time.perf_counter() - start,
+            already_paid=paid is None
+        )
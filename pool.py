@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from metrics import DB_CONNECTIONS_EVICTED, DB_CONNECTIONS_OPENED
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionOpenError(Exception):
+    """Raised when a new database connection could not be opened, before any query was sent"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections.
+
+    Connections are created on demand up to ``size``. Idle connections are
+    validated by a background thread, and connections that raised while checked
+    out are only pinged again on their next checkout, so healthy queries never
+    pay for a ``SELECT 1`` round trip.
+    """
+
+    def __init__(self, factory, size=None, health_check_interval=None, max_idle=None):
+        self.factory = factory
+        self.size = size or int(os.getenv('DB_POOL_SIZE', '4'))
+        self.health_check_interval = health_check_interval or float(os.getenv('DB_POOL_HEALTH_INTERVAL', '30'))
+        # Idle connections older than this are pinged by the health checker
+        self.max_idle = max_idle or float(os.getenv('DB_POOL_MAX_IDLE', '60'))
+        self._idle = deque()  # (connection, last_used, suspect)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._closed = threading.Event()
+        self._health_thread = threading.Thread(target=self._health_loop, name='db-pool-health', daemon=True)
+        self._health_thread.start()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the with-block"""
+        if self._closed.is_set():
+            raise RuntimeError("Connection pool is closed")
+        self._slots.acquire()
+        conn = None
+        suspect = False
+        try:
+            conn = self._checkout()
+            yield conn
+        except Exception:
+            # The error may have come from a dead socket; validate before reuse
+            suspect = True
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn, suspect)
+            self._slots.release()
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, _, suspect = self._idle.pop()
+            if not suspect or self._is_alive(conn):
+                return conn
+            logger.warning("Evicting dead database connection from pool")
+            DB_CONNECTIONS_EVICTED.inc()
+            self._discard(conn)
+        try:
+            conn = self.factory()
+        except Exception as e:
+            raise ConnectionOpenError(str(e)) from e
+        DB_CONNECTIONS_OPENED.inc()
+        return conn
+
+    def _checkin(self, conn, suspect=False):
+        if self._closed.is_set():
+            self._discard(conn)
+            return
+        with self._lock:
+            # Checkouts during a health check open extra connections; keep at most size of them
+            full = len(self._idle) >= self.size
+            if not full:
+                self._idle.append((conn, time.monotonic(), suspect))
+        if full:
+            self._discard(conn)
+
+    def _is_alive(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _health_loop(self):
+        while not self._closed.wait(self.health_check_interval):
+            self.validate_idle()
+
+    def validate_idle(self):
+        """Ping connections that have sat idle for longer than max_idle and drop dead ones"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [entry for entry in self._idle if entry[2] or now - entry[1] >= self.max_idle]
+            for entry in stale:
+                self._idle.remove(entry)
+
+        evicted = 0
+        for conn, _, _ in stale:
+            if self._is_alive(conn):
+                self._checkin(conn)
+            else:
+                self._discard(conn)
+                evicted += 1
+        if evicted:
+            DB_CONNECTIONS_EVICTED.inc(amount=evicted)
+            logger.warning("Evicted %s dead database connection(s) from pool", evicted)
+
+    def close(self):
+        """Close every idle connection and stop the health checker"""
+        self._closed.set()
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _, _ in idle:
+            self._discard(conn)
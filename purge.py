@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from datetime import timedelta
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord refuses bulk deletes of messages older than 14 days; keep a margin
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+BULK_DELETE_MAX = 100
+
+
+class PurgeFilter:
+    """Which messages a purge should delete; every given criterion must match"""
+
+    def __init__(self, author=None, pattern=None, attachments=False, bots=False):
+        self.author_id = author.id if author is not None else None
+        self.pattern = re.compile(pattern, re.IGNORECASE) if pattern else None
+        self.attachments = attachments
+        self.bots = bots
+
+    def matches(self, message):
+        if self.author_id is not None and message.author.id != self.author_id:
+            return False
+        if self.bots and not message.author.bot:
+            return False
+        if self.attachments and not message.attachments:
+            return False
+        if self.pattern is not None and not self.pattern.search(message.content):
+            return False
+        return True
+
+
+class PurgeJob:
+    """Deletes up to ``limit`` matching messages from a channel.
+
+    History is streamed lazily, newer messages are removed in bulk batches of
+    up to 100 and messages past the bulk-delete age are deleted one by one
+    with a delay between them. cancel() stops the job after the current batch.
+    """
+
+    def __init__(self, channel, limit, message_filter=None, scan_limit=None, before=None):
+        self.channel = channel
+        self.limit = limit
+        self.filter = message_filter or PurgeFilter()
+        self.scan_limit = scan_limit or int(os.getenv('PURGE_SCAN_LIMIT', '20000'))
+        self.before = before
+        self.single_delete_delay = float(os.getenv('PURGE_SINGLE_DELETE_DELAY', '1'))  # seconds
+        self.progress_interval = float(os.getenv('PURGE_PROGRESS_INTERVAL', '2'))  # seconds
+        self.scanned = 0
+        self.deleted = 0
+        self.failed = 0
+        self.cancelled = False
+        self.finished = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def summary(self):
+        state = "cancelled" if self.cancelled else "finished" if self.finished else "running"
+        text = f"Purge {state}: deleted {self.deleted}/{self.limit}, scanned {self.scanned}"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text
+
+    async def run(self, on_progress=None):
+        last_report = time.monotonic()
+        batch = []
+
+        async def report(force=False):
+            nonlocal last_report, on_progress
+            if on_progress is not None and (force or time.monotonic() - last_report >= self.progress_interval):
+                last_report = time.monotonic()
+                try:
+                    await on_progress(self)
+                except discord.HTTPException as e:
+                    # Usually the interaction token expired after 15 minutes; keep deleting without updates
+                    logger.warning("Stopped purge progress updates for channel %s: %s", self.channel.id, e)
+                    on_progress = None
+
+        try:
+            cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+            async for message in self.channel.history(limit=self.scan_limit, before=self.before):
+                if self.cancelled or self.deleted + len(batch) >= self.limit:
+                    break
+                self.scanned += 1
+                if not self.filter.matches(message):
+                    continue
+
+                if message.created_at > cutoff:
+                    batch.append(message)
+                    if len(batch) == BULK_DELETE_MAX:
+                        await self._delete_batch(batch)
+                        batch = []
+                        await report()
+                    continue
+
+                # History is newest first, so everything from here on is too old to bulk delete
+                if batch:
+                    await self._delete_batch(batch)
+                    batch = []
+                await self._delete_single(message)
+                await report()
+                await asyncio.sleep(self.single_delete_delay)
+
+            if batch and not self.cancelled:
+                await self._delete_batch(batch)
+        finally:
+            self.finished = True
+        await report(force=True)
+        return self
+
+    async def _delete_batch(self, messages):
+        if len(messages) == 1:
+            await self._delete_single(messages[0])
+            return
+        try:
+            await self.channel.delete_messages(messages)
+            self.deleted += len(messages)
+        except discord.NotFound:
+            # Someone else deleted one of them; fall back so the rest still go
+            for message in messages:
+                await self._delete_single(message)
+        except discord.HTTPException as e:
+            self.failed += len(messages)
+            logger.error("Bulk delete of %s message(s) failed: %s", len(messages), e)
+
+    async def _delete_single(self, message):
+        try:
+            await message.delete()
+            self.deleted += 1
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            self.failed += 1
+            logger.error("Deleting message %s failed: %s", message.id, e)
+
+
+class PurgeCancelView(discord.ui.View):
+    """Cancel button for a running purge, usable only by whoever started it"""
+
+    def __init__(self, job, owner_id):
+        super().__init__(timeout=None)
+        self.job = job
+        self.owner_id = owner_id
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger)
+    async def cancel_purge(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("Only the moderator who started this purge can cancel it!", ephemeral=True)
+            return
+        self.job.cancel()
+        button.disabled = True
+        await interaction.response.edit_message(content="Cancelling purge...", view=self)
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+from metrics import DB_RETRIES
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is rejecting calls"""
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, awaited on the event loop"""
+
+    def __init__(self, max_retries=None, base_delay=None, max_delay=None):
+        self.max_retries = max_retries or int(os.getenv('DB_MAX_RETRIES', '3'))
+        self.base_delay = base_delay or float(os.getenv('DB_RETRY_BASE_DELAY', '0.5'))  # seconds
+        self.max_delay = max_delay or float(os.getenv('DB_RETRY_MAX_DELAY', '8'))  # seconds
+
+    def backoff(self, attempt):
+        """Delay before retry number ``attempt`` (1-based)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    async def run(self, operation, breaker=None, description="operation", give_up_on=(), retry_on=Exception):
+        """Await operation() until it succeeds, retries run out or the breaker opens.
+
+        Exceptions in give_up_on are raised immediately and count as a healthy
+        response, since the database itself answered. Other exceptions not in
+        retry_on count as failures but are raised without retrying.
+        """
+        attempt = 0
+        while True:
+            if breaker is not None and not breaker.allow_request():
+                raise CircuitOpenError(f"Database circuit is {breaker.state}, refusing {description}")
+            try:
+                result = await operation()
+            except give_up_on:
+                if breaker is not None:
+                    breaker.record_success()
+                raise
+            except Exception as e:
+                attempt += 1
+                if breaker is not None:
+                    breaker.record_failure()
+                logger.warning("Error running %s (attempt %s/%s): %s", description, attempt, self.max_retries, e)
+                if not isinstance(e, retry_on):
+                    logger.error("%s failed and is not safe to retry", description)
+                    raise
+                if attempt >= self.max_retries:
+                    logger.error("Max retries reached. %s failed.", description)
+                    raise
+                delay = self.backoff(attempt)
+                DB_RETRIES.inc(description)
+                logger.warning("Retrying %s in %.2f seconds...", description, delay)
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled mid-call; without an outcome the next call becomes the trial
+                if breaker is not None:
+                    breaker.release_trial()
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker shared by every database call.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls
+    fail fast. Once ``reset_timeout`` seconds have passed a single trial call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or int(os.getenv('DB_BREAKER_THRESHOLD', '5'))
+        self.reset_timeout = reset_timeout or float(os.getenv('DB_BREAKER_RESET', '30'))  # seconds
+        self.failures = 0
+        self.opened_at = None
+        self.total_trips = 0
+        self._state = self.CLOSED
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._transition(self.HALF_OPEN)
+
+    def _transition(self, state):
+        if state != self._state:
+            logger.warning("Database circuit breaker: %s -> %s", self._state, state)
+            self._state = state
+
+    def allow_request(self):
+        """Return True if a call may be attempted right now"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            self._transition(self.CLOSED)
+
+    def release_trial(self):
+        """Allow a new half-open trial after one ended without a result"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.total_trips += 1
+                self.opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    def retry_after(self):
+        """Seconds until the next trial call is allowed, 0 unless open"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
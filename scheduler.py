@@ -0,0 +1,219 @@
+import asyncio
+import heapq
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from sharding import owns_guild
+
+logger = logging.getLogger(__name__)
+
+DURATION_PATTERN = re.compile(r'(\d+)\s*(w|d|h|m|s)', re.IGNORECASE)
+DURATION_UNITS = {'w': 'weeks', 'd': 'days', 'h': 'hours', 'm': 'minutes', 's': 'seconds'}
+
+# Upper bound on one sleep, so clock jumps are picked up eventually
+MAX_SLEEP = 300  # seconds
+
+
+def parse_duration(text):
+    """timedelta for strings like '30m', '12h' or '1w2d'; raises ValueError otherwise"""
+    text = (text or '').strip()
+    matches = DURATION_PATTERN.findall(text)
+    if not matches or DURATION_PATTERN.sub('', text).strip():
+        raise ValueError(f"Invalid duration '{text}', use e.g. 30m, 12h, 7d or 1w2d")
+    duration = timedelta()
+    for amount, unit in matches:
+        duration += timedelta(**{DURATION_UNITS[unit.lower()]: int(amount)})
+    if duration <= timedelta():
+        raise ValueError("Duration must be positive")
+    return duration
+
+
+def end_of_week(now=None):
+    """Start of the next ISO week (Monday 00:00 UTC), the deadline for weekly payments"""
+    now = now or datetime.now(timezone.utc)
+    start_of_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start_of_today + timedelta(days=7 - now.weekday())
+
+
+class ScheduledAction(NamedTuple):
+    # A tuple rather than a class instance keeps hundreds of thousands of pending actions small
+    id: int
+    kind: str
+    guild_id: int
+    user_id: int
+    run_at: float
+    payload: str
+    attempts: int
+
+    def data(self):
+        return json.loads(self.payload) if self.payload else {}
+
+
+class Scheduler:
+    """Runs persisted actions at their due time from one task and a min-heap.
+
+    Every pending action lives in the scheduled_actions table and in memory as
+    a (run_at, id) heap entry, so scheduling and cancelling are O(log n) and a
+    single task sleeps until the earliest deadline. Due actions are fired in
+    batches and removed from the table in one transaction. Cancelled actions
+    are dropped from ``actions`` and their heap entries skipped when popped.
+    """
+
+    def __init__(self, bot, db, batch_size=None, load_batch=None):
+        self.bot = bot
+        self.db = db
+        self.batch_size = batch_size or int(os.getenv('SCHEDULER_BATCH_SIZE', '500'))
+        self.load_batch = load_batch or int(os.getenv('SCHEDULER_LOAD_BATCH', '5000'))
+        self.max_attempts = int(os.getenv('SCHEDULER_MAX_ATTEMPTS', '3'))
+        self.retry_delay = float(os.getenv('SCHEDULER_RETRY_DELAY', '60'))  # seconds
+        self.handlers = {}
+        self.actions = {}  # id -> ScheduledAction
+        self._heap = []  # (run_at, id)
+        # Created in start() so it belongs to the running loop
+        self._wake = None
+        self._task = None
+
+    def __len__(self):
+        return len(self.actions)
+
+    def handler(self, kind):
+        """Decorator registering the coroutine that runs actions of this kind"""
+        def decorator(func):
+            self.handlers[kind] = func
+            return func
+        return decorator
+
+    async def load(self):
+        """Rebuild the heap from the database; call from setup_hook"""
+        self.actions.clear()
+        after_id = 0
+        while True:
+            rows = await self.db.get_scheduled_actions_page(after_id, self.load_batch)
+            for row in rows:
+                action = ScheduledAction(*row)
+                # Cluster workers only run actions for guilds on their own shards
+                if owns_guild(action.guild_id):
+                    self.actions[action.id] = action
+            if len(rows) < self.load_batch:
+                break
+            after_id = rows[-1][0]
+        # heapify is O(n), cheaper than pushing every row
+        self._heap = [(action.run_at, action.id) for action in self.actions.values()]
+        heapq.heapify(self._heap)
+        logger.info("Loaded %s scheduled action(s)", len(self.actions))
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def schedule(self, kind, guild_id, user_id, run_at, payload=None):
+        """Persist and queue an action; run_at is a datetime or Unix timestamp. Returns its ID"""
+        if isinstance(run_at, datetime):
+            run_at = run_at.timestamp()
+        payload = json.dumps(payload) if payload is not None else None
+        action_id = await self.db.add_scheduled_action(kind, guild_id, user_id, run_at, payload)
+        self._push(ScheduledAction(action_id, kind, guild_id, user_id, run_at, payload, 0))
+        return action_id
+
+    async def pending(self, kind, guild_id, user_id):
+        """Pending actions of this kind for the member, read from the database"""
+        rows = await self.db.get_scheduled_actions(kind, guild_id, user_id)
+        return [ScheduledAction(*row) for row in rows]
+
+    async def cancel(self, kind, guild_id, user_id):
+        """Drop every pending action of this kind for the member; returns how many were removed"""
+        action_ids = await self.db.cancel_scheduled_actions(kind, guild_id, user_id)
+        for action_id in action_ids:
+            self.actions.pop(action_id, None)
+        return len(action_ids)
+
+    def _push(self, action):
+        self.actions[action.id] = action
+        heapq.heappush(self._heap, (action.run_at, action.id))
+        if self._wake is not None and self._heap[0][1] == action.id:
+            # New earliest deadline; shorten the current sleep
+            self._wake.set()
+
+    def _next_run_at(self):
+        while self._heap:
+            run_at, action_id = self._heap[0]
+            action = self.actions.get(action_id)
+            if action is not None and action.run_at == run_at:
+                return run_at
+            # Cancelled, or superseded by a retry with a later run_at
+            heapq.heappop(self._heap)
+        return None
+
+    def _pop_due(self, now):
+        batch = []
+        while len(batch) < self.batch_size:
+            run_at = self._next_run_at()
+            if run_at is None or run_at > now:
+                break
+            _, action_id = heapq.heappop(self._heap)
+            batch.append(self.actions.pop(action_id))
+        return batch
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self._wake.clear()
+            run_at = self._next_run_at()
+            delay = None if run_at is None else run_at - time.time()
+            if delay is None or delay > 0:
+                try:
+                    timeout = MAX_SLEEP if delay is None else min(delay, MAX_SLEEP)
+                    await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            batch = self._pop_due(time.time())
+            try:
+                await self._fire(batch)
+            except Exception as e:
+                logger.error("Failed to run %s scheduled action(s): %s", len(batch), e)
+
+    async def _fire(self, batch):
+        outcomes = await asyncio.gather(*(self._execute(action) for action in batch))
+        done = [action.id for action, ok in zip(batch, outcomes) if ok]
+        retries = [
+            action._replace(run_at=time.time() + self.retry_delay * 2 ** action.attempts, attempts=action.attempts + 1)
+            for action, ok in zip(batch, outcomes) if not ok
+        ]
+        await self.db.delete_scheduled_actions(done)
+        if retries:
+            await self.db.reschedule_actions([(action.run_at, action.attempts, action.id) for action in retries])
+            for action in retries:
+                self._push(action)
+        logger.debug("Ran %s scheduled action(s), %s to retry", len(done), len(retries))
+
+    async def _execute(self, action):
+        """Run one action; False means it failed and should be retried"""
+        handler = self.handlers.get(action.kind)
+        if handler is None:
+            logger.warning("No handler for scheduled %s action %s, dropping it", action.kind, action.id)
+            return True
+        try:
+            await handler(action)
+            return True
+        except Exception as e:
+            if action.attempts + 1 >= self.max_attempts:
+                logger.error("Scheduled %s action %s failed for good: %s", action.kind, action.id, e)
+                return True
+            logger.warning("Scheduled %s action %s failed, will retry: %s", action.kind, action.id, e)
+            return False
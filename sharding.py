@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import time
+
+from discord.ext import commands, tasks
+
+logger = logging.getLogger(__name__)
+
+
+def cluster_id():
+    """Index of this worker in a cluster started by cluster.py, or None when run directly"""
+    value = os.getenv('CLUSTER_ID')
+    return int(value) if value is not None else None
+
+
+def owned_shards():
+    """(shard_count, shard_ids) run by this cluster worker, or None outside a cluster"""
+    shard_ids = os.getenv('SHARD_IDS')
+    if not shard_ids:
+        return None
+    return int(os.getenv('SHARD_COUNT')), [int(shard_id) for shard_id in shard_ids.split(',')]
+
+
+def shard_config():
+    """(shard_count, shard_ids) for an AutoShardedBot, or None to run unsharded.
+
+    BOT_SHARDING=auto lets Discord pick the shard count; cluster.py sets
+    SHARD_COUNT and SHARD_IDS for each of its workers.
+    """
+    shards = owned_shards()
+    if shards is not None:
+        return shards
+    if os.getenv('BOT_SHARDING', 'off').lower() == 'auto':
+        shard_count = os.getenv('SHARD_COUNT')
+        return (int(shard_count) if shard_count else None), None
+    return None
+
+
+def owns_guild(guild_id):
+    """Whether this process runs the shard for guild_id; always true outside a cluster"""
+    shards = owned_shards()
+    if shards is None:
+        return True
+    shard_count, shard_ids = shards
+    return (guild_id >> 22) % shard_count in shard_ids
+
+
+def create_bot(**options):
+    """commands.Bot, or commands.AutoShardedBot when sharding is configured"""
+    config = shard_config()
+    if config is None:
+        return commands.Bot(**options)
+    shard_count, shard_ids = config
+    return commands.AutoShardedBot(shard_count=shard_count, shard_ids=shard_ids, **options)
+
+
+def shard_report(bot):
+    """Latency in seconds and guild count for each shard this process runs"""
+    latencies = getattr(bot, 'latencies', None) or [(0, bot.latency)]
+    shards = {shard_id: {'latency': latency, 'guilds': 0} for shard_id, latency in latencies}
+    for guild in bot.guilds:
+        shard = shards.get(guild.shard_id)
+        if shard is not None:
+            shard['guilds'] += 1
+    return shards
+
+
+class ShardReporter:
+    """Publishes this worker's shard report to the shared database for /shards"""
+
+    def __init__(self, bot, db, interval=None):
+        self.bot = bot
+        self.db = db
+        self.cluster_id = cluster_id()
+        interval = interval or float(os.getenv('CLUSTER_REPORT_INTERVAL', '30'))  # seconds
+        self.loop = tasks.loop(seconds=interval)(self._tick)
+        self.loop.before_loop(self.bot.wait_until_ready)
+
+    def start(self):
+        if self.cluster_id is not None and not self.loop.is_running():
+            self.loop.start()
+
+    def stop(self):
+        self.loop.cancel()
+
+    async def _tick(self):
+        report = {
+            'pid': os.getpid(),
+            'updated_at': time.time(),
+            # JSON object keys are strings; readers convert them back
+            'shards': shard_report(self.bot),
+        }
+        try:
+            await self.db.set_state(f"cluster:{self.cluster_id}", json.dumps(report))
+        except Exception as e:
+            logger.error("Failed to publish shard report: %s", e)
+
+    async def cluster_reports(self):
+        """Latest report of every worker, keyed by cluster ID"""
+        reports = {}
+        for key, value in await self.db.get_states('cluster:'):
+            report = json.loads(value)
+            report['shards'] = {int(shard_id): shard for shard_id, shard in report['shards'].items()}
+            reports[int(key.split(':', 1)[1])] = report
+        return reports
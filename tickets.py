@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+
+import discord
+
+from transcripts import export_transcript, transcript_lines
+
+logger = logging.getLogger(__name__)
+
+
+class TicketIndex:
+    """In-memory map of open tickets by channel and by owner.
+
+    Warmed from the database at startup and kept current by TicketManager, so
+    button clicks answer "is this a ticket, and whose?" without a query.
+    """
+
+    def __init__(self):
+        self.by_channel = {}
+        self.by_user = {}
+
+    def __len__(self):
+        return len(self.by_channel)
+
+    def warm(self, tickets):
+        self.by_channel.clear()
+        self.by_user.clear()
+        for ticket in tickets:
+            self.add(ticket)
+
+    def add(self, ticket):
+        self.by_channel[ticket['channel_id']] = ticket
+        self.by_user[ticket['user_id']] = ticket['channel_id']
+
+    def remove(self, channel_id):
+        ticket = self.by_channel.pop(channel_id, None)
+        if ticket is not None and self.by_user.get(ticket['user_id']) == channel_id:
+            del self.by_user[ticket['user_id']]
+        return ticket
+
+    def get(self, channel_id):
+        return self.by_channel.get(channel_id)
+
+    def open_channel_for(self, user_id):
+        return self.by_user.get(user_id)
+
+
+def panel_color(name):
+    """discord.Color for a stored panel color name such as 'blue'"""
+    factory = getattr(discord.Color, (name or '').lower(), None)
+    return factory() if callable(factory) else discord.Color.blue()
+
+
+class TicketPanelView(discord.ui.View):
+    """Persistent panel with the button that opens a ticket"""
+
+    def __init__(self, manager):
+        super().__init__(timeout=None)
+        self.manager = manager
+
+    @discord.ui.button(label="Open Ticket", emoji="🎫", style=discord.ButtonStyle.primary, custom_id="ticket:open")
+    async def open_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.manager.open(interaction)
+
+
+class TicketControlsView(discord.ui.View):
+    """Persistent claim/close buttons posted inside every ticket channel"""
+
+    def __init__(self, manager):
+        super().__init__(timeout=None)
+        self.manager = manager
+
+    @discord.ui.button(label="Claim", emoji="🙋", style=discord.ButtonStyle.success, custom_id="ticket:claim")
+    async def claim_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.manager.claim(interaction)
+
+    @discord.ui.button(label="Close", emoji="🔒", style=discord.ButtonStyle.danger, custom_id="ticket:close")
+    async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.manager.close(interaction)
+
+
+class TicketManager:
+    """Opens, claims and closes tickets, keeping the TicketIndex in sync"""
+
+    def __init__(self, bot, db):
+        self.bot = bot
+        self.db = db
+        self.index = TicketIndex()
+        self.category_id = int(os.getenv('TICKET_CATEGORY_ID', '0')) or None
+        self.close_delay = float(os.getenv('TICKET_CLOSE_DELAY', '5'))  # seconds
+        # Transcripts of closed tickets are posted here when set
+        self.log_channel_id = int(os.getenv('TICKET_LOG_CHANNEL_ID', '0')) or None
+        self._opening = set()
+
+    async def load(self):
+        """Warm the index and register the persistent views; call from setup_hook"""
+        self.index.warm(await self.db.get_open_tickets())
+        self.bot.add_view(TicketPanelView(self))
+        self.bot.add_view(TicketControlsView(self))
+        logger.info("Loaded %s open ticket(s)", len(self.index))
+
+    async def is_staff(self, member):
+        if member.guild_permissions.manage_guild:
+            return True
+        mod_roles = await self.db.get_mod_roles()
+        return any(role.id in mod_roles for role in member.roles)
+
+    async def send_panel(self, channel):
+        panel = await self.db.get_ticket_panel()
+        embed = discord.Embed(
+            title=panel['title'],
+            description=panel['description'],
+            color=panel_color(panel['color'])
+        )
+        await channel.send(embed=embed, view=TicketPanelView(self))
+
+    async def open(self, interaction):
+        user = interaction.user
+        existing = self.index.open_channel_for(user.id)
+        if existing is not None and interaction.guild.get_channel(existing) is None:
+            # Deleted by hand while the bot was offline
+            await self.channel_deleted(existing)
+            existing = None
+        if existing is not None or user.id in self._opening:
+            channel_ref = f"<#{existing}>" if existing else "your ticket"
+            await interaction.response.send_message(f"You already have an open ticket: {channel_ref}", ephemeral=True)
+            return
+
+        self._opening.add(user.id)
+        try:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            guild = interaction.guild
+            mod_roles = await self.db.get_mod_roles()
+            overwrites = {
+                guild.default_role: discord.PermissionOverwrite(view_channel=False),
+                guild.me: discord.PermissionOverwrite(view_channel=True, send_messages=True, manage_channels=True),
+                user: discord.PermissionOverwrite(view_channel=True, send_messages=True, attach_files=True),
+            }
+            for role_id in mod_roles:
+                role = guild.get_role(role_id)
+                if role is not None:
+                    overwrites[role] = discord.PermissionOverwrite(view_channel=True, send_messages=True)
+
+            category = guild.get_channel(self.category_id) if self.category_id else None
+            channel = await guild.create_text_channel(
+                f"ticket-{user.name}",
+                overwrites=overwrites,
+                category=category if isinstance(category, discord.CategoryChannel) else None,
+                reason=f"Ticket opened by {user}"
+            )
+            ticket_id = await self.db.create_ticket(user.id, channel.id)
+            self.index.add({'id': ticket_id, 'user_id': user.id, 'channel_id': channel.id, 'claimed_by': None})
+            await self.db.log_ticket_action(ticket_id, 'open', f"Opened by {user.id}")
+
+            embed = discord.Embed(
+                title=f"Ticket #{ticket_id}",
+                description=f"{user.mention} a moderator will be with you shortly.",
+                color=discord.Color.blue()
+            )
+            await channel.send(embed=embed, view=TicketControlsView(self))
+            await interaction.followup.send(f"Your ticket has been created: {channel.mention}", ephemeral=True)
+        except discord.Forbidden:
+            await interaction.followup.send("I don't have permission to create ticket channels!", ephemeral=True)
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+        finally:
+            self._opening.discard(user.id)
+
+    async def claim(self, interaction):
+        ticket = self.index.get(interaction.channel_id)
+        if ticket is None:
+            await interaction.response.send_message("This channel is not an open ticket!", ephemeral=True)
+            return
+        if not await self.is_staff(interaction.user):
+            await interaction.response.send_message("Only moderators can claim tickets!", ephemeral=True)
+            return
+        if ticket['claimed_by'] is not None:
+            await interaction.response.send_message(f"This ticket is already claimed by <@{ticket['claimed_by']}>", ephemeral=True)
+            return
+
+        try:
+            ticket['claimed_by'] = interaction.user.id
+            await self.db.claim_ticket(interaction.channel_id, interaction.user.id)
+            await self.db.log_ticket_action(ticket['id'], 'claim', f"Claimed by {interaction.user.id}")
+            await interaction.response.send_message(f"{interaction.user.mention} has claimed this ticket.")
+        except Exception as e:
+            ticket['claimed_by'] = None
+            await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+
+    async def close(self, interaction):
+        ticket = self.index.get(interaction.channel_id)
+        if ticket is None:
+            await interaction.response.send_message("This channel is not an open ticket!", ephemeral=True)
+            return
+        if interaction.user.id != ticket['user_id'] and not await self.is_staff(interaction.user):
+            await interaction.response.send_message("Only the ticket owner or a moderator can close this ticket!", ephemeral=True)
+            return
+
+        try:
+            await self.db.close_ticket(interaction.channel_id)
+            self.index.remove(interaction.channel_id)
+            await self.db.log_ticket_action(ticket['id'], 'close', f"Closed by {interaction.user.id}")
+            await interaction.response.send_message(f"Ticket closed by {interaction.user.mention}. This channel will be deleted in {self.close_delay:.0f} seconds.")
+        except Exception as e:
+            await interaction.response.send_message(f"An error occurred: {str(e)}", ephemeral=True)
+            return
+
+        await self.send_transcript(interaction.channel, ticket)
+        await asyncio.sleep(self.close_delay)
+        try:
+            await interaction.channel.delete(reason=f"Ticket closed by {interaction.user}")
+        except discord.HTTPException as e:
+            logger.error("Failed to delete ticket channel %s: %s", interaction.channel_id, e)
+
+    async def channel_deleted(self, channel_id):
+        """Close the ticket of a channel deleted without the Close button"""
+        ticket = self.index.remove(channel_id)
+        if ticket is None:
+            return
+        try:
+            await self.db.close_ticket(channel_id)
+            await self.db.log_ticket_action(ticket['id'], 'close', "Channel deleted")
+        except Exception as e:
+            logger.error("Failed to close ticket for deleted channel %s: %s", channel_id, e)
+
+    async def send_transcript(self, channel, ticket):
+        if self.log_channel_id is None:
+            return
+        log_channel = self.bot.get_channel(self.log_channel_id)
+        if log_channel is None:
+            logger.warning("Ticket log channel %s not found", self.log_channel_id)
+            return
+        try:
+            file = await export_transcript(
+                transcript_lines(channel, ticket, self.db),
+                f"ticket-{ticket['id']}.txt"
+            )
+            await log_channel.send(f"Transcript for ticket #{ticket['id']} (<@{ticket['user_id']}>)", file=file)
+        except Exception as e:
+            logger.error("Failed to export transcript for ticket %s: %s", ticket['id'], e)
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+import discord
+
+# Transcripts larger than this spill from memory to a temporary file on disk
+SPOOL_MAX_BYTES = int(os.getenv('TRANSCRIPT_SPOOL_BYTES', str(1024 * 1024)))
+
+
+def format_message(message):
+    line = f"[{message.created_at:%Y-%m-%d %H:%M:%S}] {message.author} ({message.author.id}): {message.content}"
+    for attachment in message.attachments:
+        line += f"\n    [attachment] {attachment.url}"
+    for embed in message.embeds:
+        if embed.title or embed.description:
+            line += f"\n    [embed] {embed.title or ''} {embed.description or ''}".rstrip()
+    return line + "\n"
+
+
+async def transcript_lines(channel, ticket, db, page_size=500):
+    """Yield a ticket transcript line by line.
+
+    Channel history is fetched lazily page by page and log rows are read with
+    keyset paging, so memory use does not grow with the size of the ticket.
+    """
+    yield f"Transcript for ticket #{ticket['id']} (#{channel.name}, owner {ticket['user_id']})\n\n"
+
+    async for message in channel.history(limit=None, oldest_first=True):
+        yield format_message(message)
+
+    yield "\n--- Ticket log ---\n"
+    # Make sure buffered actions, including the close itself, are on disk
+    await db.flush_ticket_logs()
+    after = None
+    while True:
+        rows = await db.get_ticket_logs_page(ticket['id'], after, page_size)
+        for row_id, action, timestamp, details in rows:
+            yield f"[{timestamp}] {action}: {details or ''}\n"
+        if len(rows) < page_size:
+            break
+        after = (rows[-1][2], rows[-1][0])
+
+
+async def export_transcript(lines, filename):
+    """Write an async iterable of lines into a discord.File with bounded memory"""
+    fp = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+b')
+    try:
+        async for line in lines:
+            fp.write(line.encode('utf-8'))
+        fp.seek(0)
+    except Exception:
+        fp.close()
+        raise
+    # discord.File closes (and so deletes) the spool once it has been sent
+    return discord.File(fp, filename=filename)
@@ -0,0 +1,130 @@
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+from metrics import LOOP_STALLS, LOOP_STALL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def call_site(frames):
+    """Innermost frame in the bot's own code, where a blocking call was made from.
+
+    Falls back to the innermost frame when the loop is stuck outside our code.
+    """
+    for frame in reversed(frames):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(ROOT + os.sep) and 'site-packages' not in path and path != _THIS_FILE:
+            return frame
+    return frames[-1] if frames else None
+
+
+class LoopWatchdog:
+    """Measures event loop responsiveness from a separate thread.
+
+    The thread schedules a no-op on the loop every ``interval`` seconds. When
+    the loop takes longer than ``threshold`` to run it, the loop thread's stack
+    is captured while it is still stuck, and once the loop answers the stall
+    is recorded with its duration in a ring buffer of recent stalls.
+    """
+
+    def __init__(self, threshold=None, interval=None, history=None):
+        self.threshold = threshold or float(os.getenv('WATCHDOG_STALL_THRESHOLD', '0.25'))  # seconds
+        self.interval = interval or float(os.getenv('WATCHDOG_INTERVAL', '0.1'))  # seconds
+        self.recent = deque(maxlen=history or int(os.getenv('WATCHDOG_HISTORY', '50')))
+        self.sites = Counter()
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.loop = None
+        self._loop_thread_id = None
+        self._ping_sent = None
+        self._current = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, loop):
+        """Start watching loop; call from the loop's own thread"""
+        if self._thread is not None:
+            return
+        self.loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                sent = self._ping_sent
+                if sent is None:
+                    self._ping_sent = time.monotonic()
+                elif self._current is None and time.monotonic() - sent >= self.threshold:
+                    self._current = self._capture(sent)
+            if sent is None:
+                try:
+                    self.loop.call_soon_threadsafe(self._pong)
+                except RuntimeError:
+                    # The loop has been closed
+                    return
+
+    def _pong(self):
+        answered = time.monotonic()
+        with self._lock:
+            sent, stall = self._ping_sent, self._current
+            self._ping_sent = None
+            self._current = None
+        if sent is None:
+            return
+        self.last_lag = answered - sent
+        self.max_lag = max(self.max_lag, self.last_lag)
+        if stall is not None:
+            self._record(stall, answered - sent)
+
+    def _capture(self, since):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        frames = traceback.extract_stack(frame) if frame is not None else []
+        site = call_site(frames)
+        return {
+            'started_at': time.time() - (time.monotonic() - since),
+            'site': f"{os.path.relpath(site.filename, ROOT)}:{site.lineno} in {site.name}" if site else "unknown",
+            'stack': ''.join(traceback.format_list(frames[-30:])),
+        }
+
+    def _record(self, stall, duration):
+        stall['duration'] = duration
+        self.recent.append(stall)
+        self.sites[stall['site']] += 1
+        self.stalls += 1
+        self.stalled_seconds += duration
+        LOOP_STALLS.inc()
+        LOOP_STALL_SECONDS.observe(duration)
+        logger.warning("Event loop stalled for %.0fms at %s", duration * 1000, stall['site'],
+                       extra={'stack': stall['stack']})
+
+    def report(self, limit=10):
+        """Counters, the busiest call sites and the most recent stalls, newest first"""
+        return {
+            'threshold': self.threshold,
+            'stalls': self.stalls,
+            'stalled_seconds': self.stalled_seconds,
+            'last_lag': self.last_lag,
+            'max_lag': self.max_lag,
+            'top_sites': self.sites.most_common(5),
+            'recent': list(reversed(self.recent))[:limit],
+        }
@@ -0,0 +1,80 @@
+import os
+import threading
+
+
+class BalanceWriteBuffer:
+    """Coalesces economy balance writes per user until they are flushed.
+
+    Only the latest balance for each user is kept, so a burst of payouts to the
+    same member costs a single row in the next flush. Entries stay readable
+    while their flush is in flight, which keeps get_balance read-your-writes.
+    """
+
+    def __init__(self, max_pending=None, flush_interval=None):
+        self.max_pending = max_pending or int(os.getenv('BALANCE_FLUSH_THRESHOLD', '100'))
+        self.flush_interval = flush_interval or float(os.getenv('BALANCE_FLUSH_INTERVAL', '1'))  # seconds
+        self._pending = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def put(self, user_id, balance):
+        """Buffer a balance; returns True once the buffer should be flushed"""
+        with self._lock:
+            self._pending[user_id] = balance
+            return len(self._pending) >= self.max_pending
+
+    def get(self, user_id):
+        """Latest unflushed balance for user_id, or None if nothing is buffered"""
+        with self._lock:
+            if user_id in self._pending:
+                return self._pending[user_id]
+            return self._in_flight.get(user_id)
+
+    def begin_flush(self):
+        """Move pending writes in flight and return them; callers must serialize flushes"""
+        with self._lock:
+            self._in_flight = self._pending
+            self._pending = {}
+            return dict(self._in_flight)
+
+    def end_flush(self, success):
+        """Finish the in-flight flush, re-queueing its writes if it failed"""
+        with self._lock:
+            if not success:
+                # Writes buffered during the flush are newer and win
+                for user_id, balance in self._in_flight.items():
+                    self._pending.setdefault(user_id, balance)
+            self._in_flight = {}
+
+
+class RowWriteBuffer:
+    """Append-only rows waiting to be inserted in one batch"""
+
+    def __init__(self, max_pending=None):
+        self.max_pending = max_pending or int(os.getenv('TICKET_LOG_FLUSH_THRESHOLD', '50'))
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows)
+
+    def put(self, row):
+        """Buffer a row; returns True once the buffer should be flushed"""
+        with self._lock:
+            self._rows.append(row)
+            return len(self._rows) >= self.max_pending
+
+    def drain(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+            return rows
+
+    def restore(self, rows):
+        """Put back rows from a failed flush ahead of anything buffered since"""
+        with self._lock:
+            self._rows = rows + self._rows